@@ -0,0 +1,201 @@
+"""Пропускная способность страниц чтения: WSGI против ASGI.
+
+Три режима, каждый в своём процессе:
+    wsgi        синхронные view, пул из --workers потоков-воркеров;
+    asgi-sync   те же синхронные view под ASGI-обработчиком Django;
+    asgi-async  async-view из urls_async, база в пуле ASYNC_DB_THREADS.
+
+Медленный клиент дочитывает ответ --client-delay секунд. Под WSGI
+всё это время занят воркер, под ASGI ждёт только корутина запроса.
+
+Запуск из корня репозитория:
+    python benchmarks/asgi_vs_wsgi.py news
+    python benchmarks/asgi_vs_wsgi.py notes --clients 128 --client-delay 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from wsgiref.util import setup_testing_defaults
+
+from load import (
+    DATA_DIR, RESULTS_DIR, SMALL, git_revision, percentile, seed,
+    setup_django,
+)
+
+MODES = ('wsgi', 'asgi-sync', 'asgi-async')
+
+
+def targets(project, rng):
+    """Адреса для запросов и cookie сессии, если нужен вход."""
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from django.urls import reverse
+    if project == 'news':
+        from news.models import News
+        ids = list(News.objects.values_list('pk', flat=True)[:1000])
+        return [reverse('news:detail', args=(pk,)) for pk in ids], ''
+    from notes.models import Note
+    author = get_user_model().objects.filter(
+        pk__in=Note.objects.values('author')
+    ).first()
+    client = Client()
+    client.force_login(author)
+    return [reverse('notes:list')], '; '.join(
+        f'{name}={morsel.value}' for name, morsel in client.cookies.items()
+    )
+
+
+def run_wsgi(paths, cookie, args, rng):
+    from django.core.wsgi import get_wsgi_application
+    application = get_wsgi_application()
+    workers = threading.BoundedSemaphore(args.workers)
+
+    def one(_):
+        environ = {'PATH_INFO': rng.choice(paths), 'HTTP_COOKIE': cookie}
+        setup_testing_defaults(environ)
+        statuses = []
+        started = time.perf_counter()
+        with workers:
+            body = application(
+                environ, lambda status, headers, exc_info=None:
+                statuses.append(int(status[:3]))
+            )
+            try:
+                for _ in body:
+                    pass
+                # Воркер не свободен, пока клиент не дочитал ответ.
+                time.sleep(args.client_delay)
+            finally:
+                body.close()
+        return time.perf_counter() - started, statuses[0]
+
+    with ThreadPoolExecutor(args.clients) as pool:
+        return list(pool.map(one, range(args.requests)))
+
+
+def run_asgi(paths, cookie, args, rng):
+    from django.core.asgi import get_asgi_application
+    application = get_asgi_application()
+    headers = [(b'host', b'localhost')]
+    if cookie:
+        headers.append((b'cookie', cookie.encode()))
+
+    async def one():
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'},
+            'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': rng.choice(paths), 'raw_path': b'', 'query_string': b'',
+            'root_path': '', 'headers': headers,
+            'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        statuses = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+            elif not message.get('more_body'):
+                # Медленный клиент задерживает только свою корутину.
+                await asyncio.sleep(args.client_delay)
+
+        started = time.perf_counter()
+        await application(scope, receive, send)
+        return time.perf_counter() - started, statuses[0]
+
+    async def main():
+        results = []
+        remaining = iter(range(args.requests))
+
+        async def client():
+            for _ in remaining:
+                results.append(await one())
+
+        await asyncio.gather(*(client() for _ in range(args.clients)))
+        return results
+
+    return asyncio.run(main())
+
+
+def run_mode(args):
+    if args.mode == 'asgi-async':
+        os.environ['ASYNC_VIEWS'] = '1'
+        os.environ['ASYNC_DB_THREADS'] = str(args.workers)
+    rng = random.Random(args.seed)
+    DATA_DIR.mkdir(exist_ok=True)
+    setup_django(args.project, DATA_DIR / f'{args.project}-small.sqlite3')
+    seed(args.project, SMALL, rng)
+    paths, cookie = targets(args.project, rng)
+    run = run_wsgi if args.mode == 'wsgi' else run_asgi
+    started = time.perf_counter()
+    results = run(paths, cookie, args, rng)
+    wall = time.perf_counter() - started
+    latencies = [elapsed for elapsed, _ in results]
+    print(json.dumps({
+        'mode': args.mode,
+        'requests': len(results),
+        'errors': sum(1 for _, status in results if status >= 400),
+        'throughput_rps': round(len(results) / wall, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('project', choices=('news', 'notes'))
+    parser.add_argument('--mode', choices=MODES,
+                        help='Один режим в текущем процессе.')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='Потоки WSGI-воркера и пул базы async-view.')
+    parser.add_argument('--clients', type=int, default=64,
+                        help='Одновременных клиентов.')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--client-delay', type=float, default=0.05,
+                        help='Секунд, за которые клиент читает ответ.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    if args.mode:
+        run_mode(args)
+        return
+
+    report = []
+    for mode in MODES:
+        output = subprocess.run(
+            (sys.executable, __file__, *sys.argv[1:], '--mode', mode),
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        report.append(result)
+        print(
+            f'{mode:<11} {result["throughput_rps"]:>8} rps  '
+            f'p50 {result["p50_ms"]:>8} ms  p95 {result["p95_ms"]:>8} ms  '
+            f'p99 {result["p99_ms"]:>8} ms  ошибок {result["errors"]}'
+        )
+    RESULTS_DIR.mkdir(exist_ok=True)
+    started_at = datetime.now().strftime('%Y%m%d-%H%M%S')
+    output = RESULTS_DIR / f'asgi-vs-wsgi-{args.project}-{started_at}.json'
+    output.write_text(json.dumps({
+        'project': args.project,
+        'started_at': started_at,
+        'revision': git_revision(),
+        'workers': args.workers,
+        'clients': args.clients,
+        'client_delay': args.client_delay,
+        'results': report,
+    }, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f'Результат: {output}')
+
+
+if __name__ == '__main__':
+    main()
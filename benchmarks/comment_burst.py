@@ -0,0 +1,155 @@
+"""Всплеск комментариев к одной новости: запись по одному против пачек.
+
+Два режима, каждый в своём процессе и на своей копии базы:
+    direct    транзакция и INSERT на каждый комментарий;
+    buffered  групповая запись news.buffer (COMMENT_WRITE_BUFFER).
+
+--posters потоков с разными пользователями шлют комментарии к самой
+обсуждаемой новости через WSGI-обработчик Django. База SQLite в режиме
+WAL, ограничение частоты выключено. Сразу после ответа поток проверяет,
+что его комментарий уже читается: нарушения попадают в отчёт.
+
+Запуск из корня репозитория:
+    python benchmarks/comment_burst.py
+    python benchmarks/comment_burst.py --posters 64 --requests 5000
+"""
+import argparse
+import itertools
+import json
+import random
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from load import (
+    DATA_DIR, RESULTS_DIR, SMALL, git_revision, percentile, seed,
+    setup_django,
+)
+
+MODES = ('direct', 'buffered')
+
+
+def prepare(mode, rng):
+    """Копия наполненной базы для режима, чтобы режимы не мешали друг другу.
+
+    Исходная база та же, что у load.py; если её ещё нет, наполняется копия.
+    """
+    source = DATA_DIR / 'news-small.sqlite3'
+    target = DATA_DIR / f'news-burst-{mode}.sqlite3'
+    for suffix in ('', '-wal', '-shm'):
+        target.with_name(target.name + suffix).unlink(missing_ok=True)
+    if source.exists():
+        shutil.copyfile(source, target)
+    setup_django('news', target)
+    seed('news', SMALL, rng)
+    from django.conf import settings
+    from django.db import connection
+    settings.SQLITE_PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}
+    settings.COMMENT_RATE_BURST = None
+    settings.COMMENT_WRITE_BUFFER = mode == 'buffered'
+    # Соединение миграций открыто без прагм.
+    connection.close()
+
+
+def burst(args):
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from django.urls import reverse
+    from news.models import Comment, News
+    news = News.objects.order_by('-comment_count', 'pk').first()
+    url = reverse('news:detail', args=(news.pk,))
+    users = list(get_user_model().objects.order_by('pk')[:args.posters])
+    local = threading.local()
+    numbers = itertools.count()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = Client(raise_request_exception=False)
+            local.user = users[next(numbers) % len(users)]
+            local.client.force_login(local.user)
+        return local.client
+
+    def one(index):
+        text = f'Срочный комментарий {index}'
+        started = time.perf_counter()
+        response = client().post(url, {'text': text})
+        elapsed = time.perf_counter() - started
+        visible = response.status_code < 400 and Comment.objects.filter(
+            news=news, author=local.user, text=text
+        ).exists()
+        return elapsed, response.status_code, visible
+
+    before = news.comment_count
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.posters) as pool:
+        results = list(pool.map(one, range(args.requests)))
+    wall = time.perf_counter() - started
+    news.refresh_from_db()
+    stored = Comment.objects.visible().filter(news=news).count()
+    latencies = [elapsed for elapsed, _, _ in results]
+    errors = sum(1 for _, status, _ in results if status >= 400)
+    return {
+        'mode': args.mode,
+        'requests': len(results),
+        'errors': errors,
+        'not_visible_after_post': sum(
+            1 for _, status, visible in results
+            if status < 400 and not visible
+        ),
+        'added': news.comment_count - before,
+        'count_drift': news.comment_count - stored,
+        'throughput_rps': round(len(results) / wall, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mode', choices=MODES,
+                        help='Один режим в текущем процессе.')
+    parser.add_argument('--posters', type=int, default=32,
+                        help='Одновременных авторов.')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    if args.mode:
+        DATA_DIR.mkdir(exist_ok=True)
+        prepare(args.mode, random.Random(args.seed))
+        print(json.dumps(burst(args)))
+        return
+
+    report = []
+    for mode in MODES:
+        output = subprocess.run(
+            (sys.executable, __file__, *sys.argv[1:], '--mode', mode),
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        report.append(result)
+        print(
+            f'{mode:<9} {result["throughput_rps"]:>8} rps  '
+            f'p50 {result["p50_ms"]:>8} ms  p95 {result["p95_ms"]:>8} ms  '
+            f'p99 {result["p99_ms"]:>8} ms  ошибок {result["errors"]}  '
+            f'не видно после POST {result["not_visible_after_post"]}'
+        )
+    RESULTS_DIR.mkdir(exist_ok=True)
+    started_at = datetime.now().strftime('%Y%m%d-%H%M%S')
+    output = RESULTS_DIR / f'comment-burst-{started_at}.json'
+    output.write_text(json.dumps({
+        'project': 'news',
+        'started_at': started_at,
+        'revision': git_revision(),
+        'posters': args.posters,
+        'results': report,
+    }, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f'Результат: {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+"""Нагрузочный прогон горячих страниц YaNews и YaNote в одном процессе.
+
+Наполняет отдельную базу SQLite данными нужного объёма, затем гоняет
+запросы через WSGI-обработчик Django из нескольких потоков и пишет
+p50/p95/p99, пропускную способность и число SQL-запросов в JSON.
+
+Запуск из корня репозитория:
+    python benchmarks/load.py news
+    python benchmarks/load.py notes --workers 32 --requests 5000
+    python benchmarks/load.py news --full    # объёмы как в проде
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = Path(__file__).resolve().parent / '.data'
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+PROJECTS = {
+    'news': ('ya_news', 'yanews.settings'),
+    'notes': ('ya_note', 'yanote.settings'),
+}
+SMALL = {'users': 100, 'news': 1_000, 'comments': 20_000, 'notes': 10_000}
+FULL = {
+    'users': 10_000, 'news': 100_000, 'comments': 10_000_000,
+    'notes': 1_000_000,
+}
+BATCH = 10_000
+PASSWORD = 'benchmark-password'
+
+
+def setup_django(project, db_path):
+    directory, settings_module = PROJECTS[project]
+    sys.path.insert(0, str(ROOT / directory))
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = str(db_path)
+    # Пишущие сценарии идут из многих потоков: ждём блокировку SQLite.
+    settings.DATABASES['default'].setdefault('OPTIONS', {})['timeout'] = 30
+    settings.ALLOWED_HOSTS = ['*']
+    settings.QUERY_STATS_HEADERS = True
+    import django
+    django.setup()
+    # Превышения бюджета запросов видны в отчёте, а не в консоли.
+    logging.getLogger(f'{project}.queries').setLevel(logging.ERROR)
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def batches(total):
+    for start in range(0, total, BATCH):
+        yield range(start, min(start + BATCH, total))
+
+
+def seed_users(count):
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    User = get_user_model()
+    password = make_password(PASSWORD)
+    for chunk in batches(count):
+        User.objects.bulk_create(
+            User(username=f'bench-{index}', password=password)
+            for index in chunk
+        )
+    return list(User.objects.values_list('pk', flat=True))
+
+
+def seed_news(volumes, user_ids, rng):
+    from news.models import Comment, News
+    fixture = json.loads(
+        (ROOT / 'ya_news/news/fixtures/news.json').read_text('utf-8')
+    )
+    shapes = [item['fields'] for item in fixture]
+    today = date.today()
+    for chunk in batches(volumes['news']):
+        News.objects.bulk_create(
+            News(
+                title=f'{shapes[index % len(shapes)]["title"][:40]} {index}',
+                text=shapes[index % len(shapes)]['text'],
+                date=today - timedelta(days=index // 20),
+            ) for index in chunk
+        )
+    news_ids = list(News.objects.values_list('pk', flat=True))
+    # Обсуждают в основном свежие новости.
+    weights = [1 / (rank + 1) for rank in range(len(news_ids))]
+    for chunk in batches(volumes['comments']):
+        targets = rng.choices(news_ids, weights=weights, k=len(chunk))
+        Comment.objects.bulk_create(
+            Comment(
+                news_id=news_id, author_id=rng.choice(user_ids),
+                text=f'Комментарий {index}: ' + 'интересно ' * 8,
+            ) for index, news_id in zip(chunk, targets)
+        )
+    News.objects.recount_comments()
+
+
+def seed_notes(volumes, user_ids, rng):
+    from notes.models import Note
+    for chunk in batches(volumes['notes']):
+        Note.objects.bulk_create(
+            Note(
+                title=f'Заметка {index}', text='Текст заметки ' * 10,
+                slug=f'bench-note-{index}', author_id=rng.choice(user_ids),
+            ) for index in chunk
+        )
+
+
+def seed(project, volumes, rng):
+    from django.contrib.auth import get_user_model
+    if get_user_model().objects.exists():
+        return
+    started = time.monotonic()
+    user_ids = seed_users(volumes['users'])
+    if project == 'news':
+        seed_news(volumes, user_ids, rng)
+    else:
+        seed_notes(volumes, user_ids, rng)
+    print(f'Наполнение базы: {time.monotonic() - started:.1f} с')
+
+
+def scenarios(project, rng):
+    """Сценарии: имя → (нужен ли вход, функция запроса клиентом)."""
+    from django.urls import reverse
+    if project == 'news':
+        from news.models import News
+        news_ids = list(
+            News.objects.values_list('pk', flat=True)[:1000]
+        )
+        return {
+            'news:home anonymous': (False, lambda client: client.get(
+                reverse('news:home'))),
+            'news:home': (True, lambda client: client.get(
+                reverse('news:home'))),
+            'news:detail': (True, lambda client: client.get(
+                reverse('news:detail', args=(rng.choice(news_ids),)))),
+            'comment POST': (True, lambda client: client.post(
+                reverse('news:detail', args=(rng.choice(news_ids),)),
+                {'text': 'Нагрузочный комментарий'})),
+        }
+    return {
+        'notes:list': (True, lambda client: client.get(
+            reverse('notes:list'))),
+        'notes:add': (True, lambda client: client.post(
+            reverse('notes:add'),
+            {'title': f'Новая заметка {rng.random()}', 'text': 'Текст'})),
+    }
+
+
+def percentile(values, share):
+    return statistics.quantiles(values, n=100)[share - 1] * 1000
+
+
+def drive(name, needs_login, request, workers, total, user_ids):
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    local = threading.local()
+    users = list(get_user_model().objects.filter(pk__in=user_ids))
+    numbers = itertools.count()
+
+    def client():
+        """У каждого потока свой клиент и свой пользователь."""
+        if not hasattr(local, 'client'):
+            # Ошибки view считаются ответом 500, а не роняют прогон.
+            local.client = Client(raise_request_exception=False)
+            if needs_login:
+                local.client.force_login(users[next(numbers) % len(users)])
+        return local.client
+
+    def one(_):
+        started = time.perf_counter()
+        response = request(client())
+        elapsed = time.perf_counter() - started
+        stats = getattr(response, 'query_stats', None)
+        return elapsed, response.status_code, stats.count if stats else 0
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        results = list(pool.map(one, range(total)))
+    wall = time.perf_counter() - started
+    latencies = [elapsed for elapsed, _, _ in results]
+    errors = sum(1 for _, status, _ in results if status >= 400)
+    return {
+        'scenario': name,
+        'requests': total,
+        'errors': errors,
+        'throughput_rps': round(total / wall, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'queries_per_request': round(
+            statistics.mean(queries for _, _, queries in results), 2
+        ),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'), cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('project', choices=PROJECTS)
+    parser.add_argument('--full', action='store_true',
+                        help='Объёмы данных как в проде (долго).')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=2000,
+                        help='Запросов на каждый сценарий.')
+    parser.add_argument('--db', type=Path,
+                        help='Файл базы; по умолчанию в benchmarks/.data.')
+    parser.add_argument('--output', type=Path,
+                        help='Файл результата; по умолчанию в '
+                             'benchmarks/results.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    volumes = FULL if args.full else SMALL
+    scale = 'full' if args.full else 'small'
+    DATA_DIR.mkdir(exist_ok=True)
+    db_path = args.db or DATA_DIR / f'{args.project}-{scale}.sqlite3'
+    rng = random.Random(args.seed)
+    setup_django(args.project, db_path)
+    seed(args.project, volumes, rng)
+
+    from django.contrib.auth import get_user_model
+    user_ids = list(get_user_model().objects.order_by('pk').values_list(
+        'pk', flat=True
+    )[:args.workers])
+    report = []
+    for name, (needs_login, request) in scenarios(args.project, rng).items():
+        result = drive(
+            name, needs_login, request, args.workers, args.requests,
+            user_ids
+        )
+        report.append(result)
+        print(
+            f'{name:<22} {result["throughput_rps"]:>8} rps  '
+            f'p50 {result["p50_ms"]:>8} ms  p95 {result["p95_ms"]:>8} ms  '
+            f'p99 {result["p99_ms"]:>8} ms  '
+            f'{result["queries_per_request"]:>5} SQL/запрос  '
+            f'ошибок {result["errors"]}'
+        )
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    started_at = datetime.now().strftime('%Y%m%d-%H%M%S')
+    output = args.output or RESULTS_DIR / (
+        f'{args.project}-{scale}-{started_at}.json'
+    )
+    output.write_text(json.dumps({
+        'project': args.project,
+        'started_at': started_at,
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'volumes': volumes,
+        'workers': args.workers,
+        'results': report,
+    }, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f'Результат: {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Сравнение фильтра запрещённых слов: цикл по списку и автомат.
+
+Запуск из корня репозитория:
+    python benchmarks/profanity.py
+"""
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'ya_news'))
+
+from news.profanity import Matcher  # noqa: E402
+
+ALPHABET = 'абвгдежзийклмнопрстуфхцчшщыэюя'
+SIZES = (10, 1_000, 50_000)
+REPEAT = 200
+
+
+def random_word(rng):
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(5, 10)))
+
+
+def loop_filter(words, text):
+    """Прежняя реализация CommentForm.clean_text."""
+    lowered_text = text.lower()
+    for word in words:
+        if word in lowered_text:
+            return word
+    return None
+
+
+def main():
+    rng = random.Random(42)
+    # Обычный комментарий без мата: худший случай для обоих вариантов.
+    text = ' '.join(random_word(rng) for _ in range(80)).replace('ъ', '')
+    print(f'Длина текста: {len(text)} символов, повторов: {REPEAT}')
+    print(f'{"слов":>8} {"цикл, мкс":>12} {"автомат, мкс":>14} '
+          f'{"сборка, мс":>12}')
+    for size in SIZES:
+        words = [random_word(rng) + 'ъ' for _ in range(size)]
+        build = timeit.timeit(lambda: Matcher(words), number=1)
+        matcher = Matcher(words)
+        assert matcher.find(text) is None is loop_filter(words, text)
+        loop = timeit.timeit(lambda: loop_filter(words, text), number=REPEAT)
+        automaton = timeit.timeit(lambda: matcher.find(text), number=REPEAT)
+        print(f'{size:>8} {loop / REPEAT * 1e6:>12.1f} '
+              f'{automaton / REPEAT * 1e6:>14.1f} {build * 1e3:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
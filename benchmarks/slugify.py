@@ -0,0 +1,63 @@
+"""Транслитерация заголовков заметок в slug с кэшем и без.
+
+Запуск из корня репозитория:
+    python benchmarks/slugify.py [--count 1000000] [--distinct 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'ya_note'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanote.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from pytils.translit import slugify  # noqa: E402
+
+from notes.slugs import cache_stats, transliterate  # noqa: E402
+
+WORDS = (
+    'заметка', 'список', 'покупок', 'идеи', 'проект', 'встреча', 'план',
+    'отпуск', 'книги', 'фильмы', 'рецепт', 'задачи', 'недели', 'звонок',
+)
+
+
+def make_titles(count, distinct, rng):
+    """Заголовки с распределением, похожим на реальный импорт."""
+    pool = [
+        ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+        + f' {index}' for index in range(distinct)
+    ]
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    return rng.choices(pool, weights=weights, k=count)
+
+
+def run(function, titles):
+    started = time.perf_counter()
+    for title in titles:
+        function(title)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--distinct', type=int, default=20_000)
+    args = parser.parse_args()
+    titles = make_titles(args.count, args.distinct, random.Random(42))
+    plain = run(slugify, titles)
+    transliterate.cache_clear()
+    cached = run(transliterate, titles)
+    print(f'Заголовков: {args.count}, различных: {args.distinct}')
+    print(f'slugify без кэша: {plain:.2f} с')
+    print(f'slugify с кэшем:  {cached:.2f} с')
+    print(f'Кэш: {cache_stats()}')
+
+
+if __name__ == '__main__':
+    main()
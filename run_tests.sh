@@ -21,24 +21,47 @@ then
     echo $LF 1>&2
     if python structure_test.py
     then
-        cd ya_news
-        export DJANGO_SETTINGS_MODULE="${DJANGO_SETTINGS_MODULE:="yanews.settings"}"
-        if pytest --tb=line 1>&2;
-        then
-            cd ../ya_note
+        # Проекты тестируются одновременно, каждый набор тестов — в
+        # PYTEST_WORKERS процессах pytest-xdist (по умолчанию по числу ядер).
+        # У каждого процесса своя тестовая база SQLite в памяти, так что
+        # процессы не мешают друг другу. Вывод собирается в файлы и
+        # печатается после завершения обоих прогонов.
+        workers="${PYTEST_WORKERS:-auto}"
+        news_log=$(mktemp)
+        note_log=$(mktemp)
+        trap 'rm -f "$news_log" "$note_log"' EXIT
+        (
+            cd ya_news
+            export DJANGO_SETTINGS_MODULE="${DJANGO_SETTINGS_MODULE:="yanews.settings_test"}"
+            pytest --tb=line -n "$workers" > "$news_log" 2>&1
+        ) &
+        news_pid=$!
+        (
+            cd ya_note
             unset DJANGO_SETTINGS_MODULE
-            export DJANGO_SETTINGS_MODULE="${DJANGO_SETTINGS_MODULE:="yanote.settings"}"
-            if pytest --tb=line 1>&2;
+            export DJANGO_SETTINGS_MODULE="${DJANGO_SETTINGS_MODULE:="yanote.settings_test"}"
+            pytest --tb=line -n "$workers" > "$note_log" 2>&1
+        ) &
+        note_pid=$!
+        wait $news_pid
+        news_status=$?
+        wait $note_pid
+        note_status=$?
+        cat "$news_log" 1>&2
+        cat "$note_log" 1>&2
+        if [[ $news_status -eq 0 ]];
+        then
+            if [[ $note_status -eq 0 ]];
             then
                 exit 0
             else
-                status=$?
+                status=$note_status
                 print_message " При запуске упали ваши тесты для проекта YaNote. Проверьте тесты этого проекта " "=" 1
                 echo \`\`\` 1>&2
                 exit $status
             fi
         else
-            status=$?
+            status=$news_status
             print_message " При запуске упали ваши тесты для проекта YaNews. Проверьте тесты этого проекта " "=" 1
             echo \`\`\` 1>&2
             exit $status
@@ -0,0 +1,5 @@
+def pytest_addoption(parser):
+    parser.addoption(
+        '--dataset-scale', type=int, default=1,
+        help='Во сколько раз увеличить общий набор данных news_dataset.'
+    )
@@ -13,3 +13,30 @@ class NewsAdmin(admin.ModelAdmin):
     inlines = [
         CommentInline,
     ]
+
+    def save_related(self, request, form, formsets, change):
+        """После правки комментариев в инлайне пересчитываем счётчик."""
+        super().save_related(request, form, formsets, change)
+        News.objects.filter(pk=form.instance.pk).recount_comments()
+
+
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    """Модерация: скрытие и удаление комментариев пачкой."""
+    list_display = ('__str__', 'author', 'news', 'created', 'is_flagged',
+                    'is_hidden')
+    list_filter = ('is_flagged', 'is_hidden')
+    list_select_related = ('author', 'news')
+    actions = ('hide_comments',)
+
+    @admin.action(description='Скрыть выбранные комментарии')
+    def hide_comments(self, request, queryset):
+        count = queryset.moderate('hide')
+        self.message_user(request, f'Скрыто комментариев: {count}')
+
+    def delete_queryset(self, request, queryset):
+        """Стандартное удаление выбранных, но со счётчиками новостей."""
+        queryset.moderate('delete')
+
+    def delete_model(self, request, obj):
+        Comment.objects.filter(pk=obj.pk).moderate('delete')
@@ -0,0 +1,143 @@
+"""JSON API для чтения новостей и комментариев.
+
+Строки читаются через values_list, без создания моделей, и отдаются
+потоком: список results кодируется пачками. Запрос к базе выполняется
+во view, а не при отдаче ответа, — под ASGI тело потокового ответа
+читается в цикле событий, где синхронный ORM недоступен.
+
+Параметры запроса:
+    fields          поля новости через запятую (по умолчанию все);
+    comment_fields  поля комментария для страницы новости;
+    limit           строк на странице, до NEWS_API_MAX_PAGE_SIZE;
+    cursor          курсор из поля next или previous прошлого ответа.
+"""
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import generic
+
+from .models import Comment, News
+from .pagination import KeysetPaginator
+from .views import NewsComments, NewsList
+
+# Имя поля в ответе → поле для values_list.
+NEWS_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'text': 'text',
+    'date': 'date',
+    'comment_count': 'comment_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+STREAM_ROWS = 500
+
+
+def stream_json(head, names, rows):
+    """Части JSON-объекта head, дополненного списком results.
+
+    Каждая строка rows превращается в объект с ключами names,
+    строки кодируются пачками по STREAM_ROWS.
+    """
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    opening = encoder.encode(head)[:-1]
+    yield opening + (', ' if head else '') + '"results": ['
+    for start in range(0, len(rows), STREAM_ROWS):
+        yield (', ' if start else '') + ', '.join(
+            encoder.encode(dict(zip(names, row)))
+            for row in rows[start:start + STREAM_ROWS]
+        )
+    yield ']}'
+
+
+class ApiMixin:
+    """Разбор параметров запроса; ошибки в них — ответ 400."""
+    read_replica = True
+
+    def get_fields(self, param, fields):
+        """Имена полей из параметра param и поля для values_list."""
+        value = self.request.GET.get(param)
+        names = value.split(',') if value else list(fields)
+        unknown = [name for name in names if name not in fields]
+        if unknown:
+            raise ValueError(
+                f'Неизвестные поля в {param}: {", ".join(unknown)}.'
+            )
+        return names, [fields[name] for name in names]
+
+    def get_limit(self):
+        value = self.request.GET.get('limit', settings.NEWS_API_PAGE_SIZE)
+        try:
+            limit = int(value)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= settings.NEWS_API_MAX_PAGE_SIZE:
+            raise ValueError(
+                'limit — целое число от 1 до '
+                f'{settings.NEWS_API_MAX_PAGE_SIZE}.'
+            )
+        return limit
+
+    def stream_page(self, paginator, names, lookups, **head):
+        """Потоковый ответ со страницей paginator и курсорами соседних."""
+        page = paginator.page_rows(
+            self.request.GET.get('cursor'), *lookups
+        )
+        size = len(paginator.fields)
+        return StreamingHttpResponse(
+            stream_json(
+                {
+                    **head,
+                    'next': page.next_cursor,
+                    'previous': page.previous_cursor,
+                },
+                names, [row[size:] for row in page.object_list],
+            ),
+            content_type='application/json',
+        )
+
+    def get(self, request, *args, **kwargs):
+        try:
+            return self.get_response()
+        except ValueError as error:
+            return JsonResponse({'error': str(error)}, status=400)
+
+
+class NewsListApi(ApiMixin, generic.View):
+    """Лента новостей в порядке главной страницы."""
+    query_budget = 3
+
+    def get_response(self):
+        names, lookups = self.get_fields('fields', NEWS_FIELDS)
+        paginator = KeysetPaginator(
+            News.objects.all(), NewsList.keyset_ordering, self.get_limit()
+        )
+        return self.stream_page(paginator, names, lookups)
+
+
+class NewsDetailApi(ApiMixin, generic.View):
+    """Новость и страница её комментариев от старых к новым."""
+    query_budget = 4
+
+    def get_response(self):
+        names, lookups = self.get_fields('fields', NEWS_FIELDS)
+        comment_names, comment_lookups = self.get_fields(
+            'comment_fields', COMMENT_FIELDS
+        )
+        news = News.objects.filter(
+            pk=self.kwargs['pk']
+        ).values_list(*lookups).first()
+        if news is None:
+            return JsonResponse({'error': 'Новость не найдена.'}, status=404)
+        paginator = KeysetPaginator(
+            Comment.objects.visible().filter(news_id=self.kwargs['pk']),
+            NewsComments.keyset_ordering, self.get_limit(),
+        )
+        return self.stream_page(
+            paginator, comment_names, comment_lookups,
+            news=dict(zip(names, news)),
+        )
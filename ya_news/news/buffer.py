@@ -0,0 +1,121 @@
+"""Групповая запись комментариев под всплеском.
+
+Запрос кладёт комментарий в очередь процесса и ждёт, пока фоновый
+поток не запишет его вместе с соседями: одна транзакция, один
+bulk_create и по одному UPDATE счётчика на новость вместо транзакции
+на каждый комментарий. Ответ уходит только после фиксации, поэтому
+автор после редиректа видит свой комментарий.
+
+Пачка набирается не дольше COMMENT_FLUSH_MS и не больше
+COMMENT_BATCH_SIZE комментариев. Включается COMMENT_WRITE_BUFFER.
+"""
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .cache import invalidate_home_page
+from .models import Comment, News
+
+# Сколько секунд запрос ждёт записи своей пачки.
+WRITE_TIMEOUT = 30
+
+
+class CommentWriteBuffer:
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def save(self, comment):
+        """Записывает комментарий в ближайшей пачке и ждёт фиксации.
+
+        Ошибка записи пачки поднимается в запросе, как при save().
+        Если пачка не собралась за WRITE_TIMEOUT, комментарий снимается
+        с очереди и поднимается FutureTimeout: повтор запроса не создаст
+        дубль. Если его пачка уже пишется, ждём её до конца.
+        """
+        future = Future()
+        self.queue.put((comment, future))
+        self.start()
+        try:
+            future.result(WRITE_TIMEOUT)
+        except FutureTimeout:
+            if future.cancel():
+                raise
+            future.result()
+
+    def start(self):
+        """Поток записи запускается при первом комментарии процесса."""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name='news-comment-writer', daemon=True
+                )
+                self.thread.start()
+
+    def collect(self):
+        """Ждёт первый комментарий, затем добирает пачку до срока.
+
+        Комментарии, которые запрос уже отменил, в пачку не попадают,
+        остальные помечаются как записываемые и отменить их нельзя.
+        """
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + settings.COMMENT_FLUSH_MS / 1000
+        while len(batch) < settings.COMMENT_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return [
+            (comment, future) for comment, future in batch
+            if future.set_running_or_notify_cancel()
+        ]
+
+    def run(self):
+        while True:
+            batch = self.collect()
+            if batch:
+                close_old_connections()
+                self.write(batch)
+
+    def write(self, batch):
+        """Пишет пачку в одной транзакции и отпускает ждущие запросы.
+
+        Если пачка не записалась, комментарии пишутся по одному:
+        ошибку получит только запрос с проблемным комментарием.
+        """
+        comments = [comment for comment, _ in batch]
+        try:
+            with transaction.atomic():
+                Comment.objects.bulk_create(comments)
+                added = Counter(comment.news_id for comment in comments)
+                for news_id, count in added.items():
+                    News.objects.filter(
+                        pk=news_id
+                    ).change_comment_count(count)
+        except Exception as error:
+            if len(batch) > 1:
+                for item in batch:
+                    self.write([item])
+                return
+            batch[0][1].set_exception(error)
+            return
+        # bulk_create не шлёт сигналов, главную сбрасываем сами.
+        invalidate_home_page()
+        for _, future in batch:
+            future.set_result(None)
+
+
+comment_buffer = CommentWriteBuffer()
@@ -0,0 +1,77 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+HOME_VERSION_KEY = 'news:home:version'
+
+
+def get_cache():
+    return caches[settings.NEWS_HOME_CACHE]
+
+
+def home_version():
+    """Текущая версия главной; растёт при любом изменении новостей.
+
+    Если версия пропала из кэша (вытеснение, рестарт), она заводится
+    заново от текущего времени, чтобы не совпасть ни с одной старой.
+    """
+    cache = get_cache()
+    version = cache.get(HOME_VERSION_KEY)
+    if version is None:
+        cache.add(HOME_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(HOME_VERSION_KEY)
+    return version
+
+
+def home_page_key(query_string):
+    """Ключ страницы включает текущую версию главной."""
+    digest = hashlib.md5(query_string.encode()).hexdigest()
+    return f'news:home:{home_version()}:{digest}'
+
+
+def invalidate_home_page():
+    """Поднимает версию, и все сохранённые страницы перестают читаться."""
+    cache = get_cache()
+    try:
+        cache.incr(HOME_VERSION_KEY)
+    except ValueError:
+        cache.add(HOME_VERSION_KEY, time.time_ns(), None)
+
+
+def comment_key(comment):
+    """Ключ фрагмента меняется вместе с Comment.modified."""
+    return f'news:comment:{comment.pk}:{comment.modified.isoformat()}'
+
+
+def with_rendered_html(comments):
+    """Комментарии с готовым HTML в атрибуте html.
+
+    Фрагменты читаются из кэша одним get_many, недостающие рендерятся
+    по news/comment.html и сохраняются одним set_many. Ссылки автора
+    на правку и удаление во фрагмент не входят.
+    """
+    cache = get_cache()
+    comments = {comment_key(comment): comment for comment in comments}
+    found = cache.get_many(comments)
+    missing = {}
+    template = None
+    for key, comment in comments.items():
+        if key not in found:
+            template = template or get_template('news/comment.html')
+            missing[key] = found[key] = template.render({'comment': comment})
+        comment.html = mark_safe(found[key])
+    if missing:
+        cache.set_many(missing, settings.COMMENT_FRAGMENT_TIMEOUT)
+    return list(comments.values())
+
+
+def forget_comment(comment):
+    get_cache().delete(comment_key(comment))
+
+
+def forget_comments(comments):
+    get_cache().delete_many([comment_key(comment) for comment in comments])
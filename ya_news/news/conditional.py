@@ -0,0 +1,51 @@
+"""Условные GET-запросы: ответ 304, пока данные страницы не изменились."""
+import hashlib
+
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+class ConditionalGetMixin:
+    """Проверяет If-None-Match и If-Modified-Since до работы view.
+
+    get_etag_data() и get_last_modified() должны обходиться одним
+    дешёвым запросом. Если ETag клиента совпал, view не выполняется
+    и отдаётся пустой 304. В ETag входит пользователь: одна и та же
+    страница для разных посетителей выглядит по-разному. Входит и
+    cookie CSRF: после нового входа токен в формах страницы другой,
+    и старая копия из кэша браузера получила бы 403 при отправке.
+    Ответ помечается no-cache, чтобы клиенты и CDN переспрашивали
+    сервер.
+    """
+
+    def get_etag_data(self):
+        """Данные, от которых зависит страница; None — без ETag."""
+        return None
+
+    def get_last_modified(self):
+        return None
+
+    def get_etag(self):
+        data = self.get_etag_data()
+        if data is None:
+            return None
+        return hashlib.md5(
+            repr((
+                self.request.user.pk,
+                self.request.META.get('CSRF_COOKIE'),
+                data,
+            )).encode()
+        ).hexdigest()
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        view = condition(
+            etag_func=lambda *args, **kwargs: self.get_etag(),
+            last_modified_func=(
+                lambda *args, **kwargs: self.get_last_modified()
+            ),
+        )(super().dispatch)
+        response = view(request, *args, **kwargs)
+        patch_cache_control(response, no_cache=True)
+        return response
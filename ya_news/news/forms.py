@@ -1,7 +1,9 @@
-from django.forms import ModelForm
+from django.conf import settings
+from django.forms import ChoiceField, Field, Form, ModelForm
 from django.core.exceptions import ValidationError
 
 from .models import Comment
+from .profanity import BadWordsFilter
 
 BAD_WORDS = (
     'редиска',
@@ -9,6 +11,9 @@ BAD_WORDS = (
     # Дополните список на своё усмотрение.
 )
 WARNING = 'Не ругайтесь!'
+RATE_WARNING = 'Слишком много комментариев подряд, подождите немного.'
+
+bad_words_filter = BadWordsFilter(BAD_WORDS)
 
 
 class CommentForm(ModelForm):
@@ -20,8 +25,35 @@ class CommentForm(ModelForm):
     def clean_text(self):
         """Не позволяем ругаться в комментариях."""
         text = self.cleaned_data['text']
-        lowered_text = text.lower()
-        for word in BAD_WORDS:
-            if word in lowered_text:
-                raise ValidationError(WARNING)
+        if bad_words_filter.find(text) is not None:
+            raise ValidationError(WARNING)
         return text
+
+
+class IdListField(Field):
+    """Список id через запятую в одном параметре.
+
+    Тысячи повторяющихся параметров упёрлись бы в
+    DATA_UPLOAD_MAX_NUMBER_FIELDS.
+    """
+
+    def to_python(self, value):
+        try:
+            return [int(item) for item in value.split(',') if item.strip()]
+        except ValueError:
+            raise ValidationError('Ожидаются числовые id через запятую.')
+
+
+class CommentBulkForm(Form):
+    """Одно действие над многими комментариями."""
+    action = ChoiceField(choices=(('hide', 'Скрыть'), ('delete', 'Удалить')))
+    ids = IdListField()
+
+    def clean_ids(self):
+        ids = self.cleaned_data['ids']
+        if len(ids) > settings.COMMENTS_BULK_LIMIT:
+            raise ValidationError(
+                f'Не больше {settings.COMMENTS_BULK_LIMIT} комментариев '
+                'за запрос.'
+            )
+        return ids
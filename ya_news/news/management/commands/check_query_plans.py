@@ -0,0 +1,121 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Subquery
+from django.utils import timezone
+
+from news.models import Comment, News
+from news.pagination import KeysetPaginator
+from news.views import NewsComments, NewsList
+
+# Обход всей таблицы без индекса: «SCAN news_news» (в SQLite до 3.36 —
+# «SCAN TABLE news_news»).
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+( AS \w+)?$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+def hot_queries():
+    """Запросы горячих страниц по именам.
+
+    Значения параметров произвольные: план от них не зависит.
+    """
+    news = KeysetPaginator(
+        NewsList().get_queryset(), NewsList.keyset_ordering,
+        settings.NEWS_COUNT_ON_HOME_PAGE,
+    )
+    news_key = (timezone.localdate(), 1)
+    comments = KeysetPaginator(
+        NewsComments(kwargs={'pk': 1}).get_queryset(),
+        NewsComments.keyset_ordering, settings.COMMENTS_COUNT_ON_NEWS_PAGE,
+    )
+    comment_key = (timezone.now(), 1)
+    return {
+        'главная: первая страница': news.keys_query(),
+        'главная: следующая страница': news.keys_query(
+            news.encode_cursor(news_key)
+        ),
+        'главная: предыдущая страница': news.keys_query(
+            news.encode_cursor(news_key, forward=False)
+        ),
+        'главная: новости страницы': news.rows_query(news_key, news_key),
+        'новость': News.objects.filter(pk=1),
+        'новость: ETag': News.objects.filter(pk=1).fingerprints()[:1],
+        'комментарии: первая страница': comments.keys_query(),
+        'комментарии: следующая страница': comments.keys_query(
+            comments.encode_cursor(comment_key)
+        ),
+        'комментарии: строки страницы': comments.rows_query(
+            comment_key, comment_key
+        ),
+        'комментарии автора': Comment.objects.filter(
+            author_id=1
+        ).order_by('pk'),
+    }
+
+
+def unbounded_subqueries(queryset):
+    """Коррелированные подзапросы в аннотациях без LIMIT.
+
+    Такой подзапрос — например, MAX по комментариям новости — читает
+    все свои строки индекса, и время растёт с длиной обсуждения,
+    хотя в плане он выглядит как обычный SEARCH.
+    """
+    return [
+        f'подзапрос {name} без LIMIT'
+        for name, annotation in queryset.query.annotations.items()
+        if isinstance(annotation, Subquery)
+        and annotation.query.high_mark is None
+    ]
+
+
+def query_plan(queryset, using):
+    """Строки EXPLAIN QUERY PLAN и те из них, что выдают медленный план.
+
+    Медленный план — обход таблицы без индекса, сортировка во
+    временном B-дереве или коррелированный подзапрос без LIMIT. Обход
+    по индексу допустим, только если запрос без условий и с LIMIT:
+    тогда читаются лишь первые строки индекса.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        plan = [row[-1] for row in cursor.fetchall()]
+    limited_walk = (
+        not queryset.query.where and queryset.query.high_mark is not None
+    )
+    slow = [
+        detail for detail in plan
+        if FULL_SCAN.match(detail) or TEMP_SORT in detail
+        or (detail.startswith('SCAN ') and not limited_walk)
+    ] + unbounded_subqueries(queryset)
+    return plan, slow
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет планы запросов горячих страниц и падает, если запрос '
+        'обходит таблицу целиком, сортирует во временном B-дереве '
+        'или читает связанные строки подзапросом без LIMIT.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if connections[using].vendor != 'sqlite':
+            raise CommandError('Проверка планов написана для SQLite.')
+        failed = []
+        for name, queryset in hot_queries().items():
+            plan, slow = query_plan(queryset, using)
+            status = 'МЕДЛЕННО' if slow else 'ок'
+            details = plan + [reason for reason in slow if reason not in plan]
+            self.stdout.write(f'{status:<9} {name}: {"; ".join(details)}')
+            if slow:
+                failed.append(name)
+        if failed:
+            raise CommandError(
+                f'Медленные планы у запросов: {", ".join(failed)}.'
+            )
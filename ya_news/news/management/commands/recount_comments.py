@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from news.cache import invalidate_home_page
+from news.models import News
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованный счётчик комментариев у новостей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'news_ids', nargs='*', type=int,
+            help='id новостей; по умолчанию пересчитываются все.'
+        )
+
+    def handle(self, *args, **options):
+        news = News.objects.all()
+        if options['news_ids']:
+            news = news.filter(pk__in=options['news_ids'])
+        updated = news.recount_comments()
+        invalidate_home_page()
+        self.stdout.write(f'Пересчитано новостей: {updated}')
@@ -0,0 +1,140 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from news.cache import invalidate_home_page
+from news.forms import bad_words_filter
+from news.models import Comment, News
+from news.profanity import Matcher
+
+ACTIONS = ('flag', 'hide', 'delete')
+
+_matcher = None
+
+
+def init_worker(words):
+    """Каждый процесс пула собирает свой автомат один раз."""
+    global _matcher
+    _matcher = Matcher(words)
+
+
+def scan(rows):
+    """Та же проверка, что в CommentForm.clean_text, для пачки строк."""
+    return [
+        (pk, news_id) for pk, news_id, text in rows
+        if _matcher.find(text) is not None
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет все комментарии по актуальному списку запрещённых '
+        'слов и помечает, скрывает или удаляет нарушителей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--action', choices=ACTIONS, default='flag')
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько комментариев читать и записывать за раз.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов для проверки; 0 — без пула.'
+        )
+
+    def read_chunks(self):
+        """Читает таблицу пачками по pk, не держа открытый курсор.
+
+        Каждая пачка — отдельный запрос по индексу первичного ключа,
+        поэтому память не растёт, а запись найденных нарушителей
+        не мешает чтению.
+        """
+        rows = Comment.objects.visible().order_by('pk').values_list(
+            'pk', 'news_id', 'text'
+        )
+        last_pk = 0
+        while True:
+            chunk = list(rows.filter(pk__gt=last_pk)[:self.chunk_size])
+            if not chunk:
+                return
+            last_pk = chunk[-1][0]
+            yield chunk
+
+    def apply(self, found):
+        """Записывает решение по найденным комментариям одной пачкой."""
+        pks = [pk for pk, _ in found]
+        with transaction.atomic():
+            if self.action == 'delete':
+                Comment.objects.filter(pk__in=pks).delete()
+            else:
+                field = 'is_flagged' if self.action == 'flag' else 'is_hidden'
+                Comment.objects.bulk_update(
+                    [Comment(pk=pk, **{field: True}) for pk in pks],
+                    (field,), batch_size=self.chunk_size
+                )
+            if self.action != 'flag':
+                News.objects.filter(
+                    pk__in={news_id for _, news_id in found}
+                ).recount_comments()
+
+    def collect(self, size, future):
+        found = future.result()
+        if found:
+            self.apply(found)
+        self.scanned += size
+        self.matched += len(found)
+        if self.verbosity > 1:
+            self.stderr.write(self.report())
+
+    def report(self):
+        rate = self.scanned / max(time.monotonic() - self.started, 1e-9)
+        return (
+            f'Проверено: {self.scanned}, нарушений: {self.matched}, '
+            f'{rate:.0f} комм./с'
+        )
+
+    def handle(self, *args, **options):
+        self.action = options['action']
+        self.chunk_size = options['chunk_size']
+        self.verbosity = options['verbosity']
+        self.scanned = self.matched = 0
+        workers = options['workers']
+        bad_words_filter.get_matcher()
+        words = bad_words_filter.all_words
+        if workers:
+            pool = ProcessPoolExecutor(
+                workers, initializer=init_worker, initargs=(words,)
+            )
+            submit = pool.submit
+        else:
+            pool = None
+            init_worker(words)
+            submit = run_inline
+        self.started = time.monotonic()
+        # В работе держим ограниченное число пачек, чтобы чтение
+        # не убегало вперёд проверки и память оставалась плоской.
+        in_flight = deque()
+        try:
+            for chunk in self.read_chunks():
+                in_flight.append((len(chunk), submit(scan, chunk)))
+                if len(in_flight) >= 2 * max(workers, 1):
+                    self.collect(*in_flight.popleft())
+            while in_flight:
+                self.collect(*in_flight.popleft())
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        if self.matched and self.action != 'flag':
+            invalidate_home_page()
+        self.stdout.write(f'{self.report()}, действие: {self.action}')
+
+
+def run_inline(function, *args):
+    future = Future()
+    future.set_result(function(*args))
+    return future
@@ -0,0 +1,291 @@
+import asyncio
+import copy
+import logging
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+from .routers import PRIMARY_PIN_COOKIE, replica_reads
+
+logger = logging.getLogger('news.queries')
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+
+
+def fingerprint(sql):
+    """SQL без литералов: одинаковые запросы с разными id совпадают."""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    return IN_LIST_RE.sub('IN (...)', sql)
+
+
+class QueryRecorder:
+    """Считает запросы ко всем базам через execute_wrapper.
+
+    В отличие от connection.queries работает и при DEBUG = False.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    @property
+    def duplicates(self):
+        """Запросы, повторённые в одном запросе к сайту, — признак N+1."""
+        return {
+            sql: count for sql, count in self.fingerprints.items()
+            if count > 1
+        }
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'time_ms': round(self.duration * 1000, 2),
+            'duplicates': self.duplicates,
+        }
+
+
+def view_query_budget(request):
+    """Бюджет запросов, объявленный у view атрибутом query_budget."""
+    match = getattr(request, 'resolver_match', None)
+    view_class = getattr(getattr(match, 'func', None), 'view_class', None)
+    return getattr(view_class, 'query_budget', None)
+
+
+class AsyncCapableMixin:
+    """Middleware, которая работает и в синхронной, и в async-цепочке.
+
+    Под ASGI с async-view Django вызывает __acall__ и не занимает
+    ради middleware отдельный поток, поэтому в ней нельзя ходить
+    в базу. Синхронная обработка — в handle().
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Так же помечает себя django.utils.deprecation.MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.handle(request)
+
+
+class QueryCountMiddleware(AsyncCapableMixin):
+    """Считает SQL-запросы каждого запроса к сайту.
+
+    Итог кладётся в response.query_stats, в заголовки X-DB-*
+    (если включён QUERY_STATS_HEADERS) и в лог news.queries;
+    превышение бюджета view и повторы запросов пишутся как warning.
+
+    Под ASGI запросы считает сам async-view в своём потоке
+    (см. news.async_views) и передаёт их в response.query_stats.
+    При QUERY_STATS_ENABLED = False middleware не подключается.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_STATS_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        return self.report(request, response, recorder)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return self.report(
+            request, response,
+            getattr(response, 'query_stats', None) or QueryRecorder()
+        )
+
+    def report(self, request, response, recorder):
+        budget = view_query_budget(request)
+        response.query_stats = recorder
+        if settings.QUERY_STATS_HEADERS:
+            response['X-DB-Query-Count'] = recorder.count
+            response['X-DB-Query-Time'] = f'{recorder.duration * 1000:.2f}'
+            response['X-DB-Duplicate-Queries'] = sum(
+                count - 1 for count in recorder.duplicates.values()
+            )
+            if budget is not None:
+                response['X-DB-Query-Budget'] = budget
+        over_budget = budget is not None and recorder.count > budget
+        logger.log(
+            logging.WARNING if over_budget or recorder.duplicates
+            else logging.DEBUG,
+            '%s %s: %d queries, %.2f ms', request.method, request.path,
+            recorder.count, recorder.duration * 1000,
+            extra={
+                'path': request.path,
+                'method': request.method,
+                'status': response.status_code,
+                'query_budget': budget,
+                **{f'queries_{key}': value
+                   for key, value in recorder.as_dict().items()},
+            },
+        )
+        return response
+
+
+class UserCache:
+    """LRU пользователей в памяти процесса с ограниченным сроком жизни.
+
+    Сигналы сбрасывают запись только в своём процессе, остальные
+    процессы увидят изменение пользователя через USER_CACHE_TIMEOUT.
+    """
+
+    def __init__(self):
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, pk):
+        with self._lock:
+            entry = self._users.get(pk)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires < time.monotonic():
+                del self._users[pk]
+                return None
+            self._users.move_to_end(pk)
+        # Каждому запросу своя копия: изменения атрибутов не утекут.
+        return copy.copy(user)
+
+    def put(self, user):
+        expires = time.monotonic() + settings.USER_CACHE_TIMEOUT
+        with self._lock:
+            self._users[user.pk] = (copy.copy(user), expires)
+            self._users.move_to_end(user.pk)
+            while len(self._users) > settings.USER_CACHE_SIZE:
+                self._users.popitem(last=False)
+
+    def invalidate(self, pk):
+        with self._lock:
+            self._users.pop(pk, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache()
+
+
+def get_cached_user(request):
+    """То же, что auth.get_user, но без запроса к базе при попадании."""
+    try:
+        pk = auth.get_user_model()._meta.pk.to_python(
+            request.session[auth.SESSION_KEY]
+        )
+        backend = request.session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    user = user_cache.get(pk)
+    if user is None:
+        user = auth.get_user(request)
+        if user.is_authenticated:
+            user_cache.put(user)
+        return user
+    session_hash = request.session.get(auth.HASH_SESSION_KEY)
+    if not (session_hash and constant_time_compare(
+        session_hash, user.get_session_auth_hash()
+    )):
+        # Сессия устарела (например, сменили пароль) — решает Django.
+        user_cache.invalidate(pk)
+        return auth.get_user(request)
+    user.backend = backend
+    return user
+
+
+class CachedUserMiddleware(AsyncCapableMixin):
+    """Подставляет request.user из user_cache, если задан USER_CACHE_SIZE.
+
+    Ставится сразу после AuthenticationMiddleware.
+    """
+
+    def set_user(self, request):
+        if settings.USER_CACHE_SIZE:
+            request.user = SimpleLazyObject(lambda: get_cached_user(request))
+
+    def handle(self, request):
+        self.set_user(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self.set_user(request)
+        return await self.get_response(request)
+
+
+class ReplicaReadsMiddleware(AsyncCapableMixin):
+    """Отправляет чтение GET-запросов к view с read_replica на реплики.
+
+    После успешного изменяющего запроса ставит cookie: пока она жива,
+    автор читает из основной базы и сразу видит свои изменения,
+    даже если реплика отстаёт.
+    """
+
+    def handle(self, request):
+        response = self.get_response(request)
+        token = getattr(request, '_replica_reads_token', None)
+        if token is not None:
+            replica_reads.reset(token)
+        return self.pin_primary(request, response)
+
+    async def __acall__(self, request):
+        # У каждого ASGI-запроса свой контекст, сбрасывать флаг не нужно.
+        return self.pin_primary(request, await self.get_response(request))
+
+    def pin_primary(self, request, response):
+        if (request.method not in ('GET', 'HEAD', 'OPTIONS')
+                and response.status_code < 400):
+            response.set_cookie(
+                PRIMARY_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        if (request.method in ('GET', 'HEAD')
+                and getattr(view_class, 'read_replica', False)
+                and PRIMARY_PIN_COOKIE not in request.COOKIES):
+            request._replica_reads_token = replica_reads.set(True)
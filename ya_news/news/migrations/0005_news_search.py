@@ -0,0 +1,52 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:15
+
+from django.db import migrations
+
+# Внешняя таблица FTS5 над news_news: текст хранится только в самой
+# таблице новостей, а триггеры обновляют индекс при любой записи,
+# включая bulk_create и QuerySet.update().
+CREATE = (
+    "CREATE VIRTUAL TABLE news_news_fts USING fts5(title, text, "
+    "content='news_news', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER news_news_fts_ai AFTER INSERT ON news_news BEGIN "
+    "INSERT INTO news_news_fts(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); END",
+    "CREATE TRIGGER news_news_fts_ad AFTER DELETE ON news_news BEGIN "
+    "INSERT INTO news_news_fts(news_news_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); END",
+    "CREATE TRIGGER news_news_fts_au AFTER UPDATE OF title, text "
+    "ON news_news BEGIN "
+    "INSERT INTO news_news_fts(news_news_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); "
+    "INSERT INTO news_news_fts(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); END",
+    "INSERT INTO news_news_fts(news_news_fts) VALUES ('rebuild')",
+)
+DROP = (
+    'DROP TRIGGER IF EXISTS news_news_fts_ai',
+    'DROP TRIGGER IF EXISTS news_news_fts_ad',
+    'DROP TRIGGER IF EXISTS news_news_fts_au',
+    'DROP TABLE IF EXISTS news_news_fts',
+)
+
+
+def run(statements):
+    """На базах, кроме SQLite, поиск работает без миграции."""
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_comment_moderation'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE), run(DROP)),
+    ]
@@ -1,16 +1,61 @@
+from contextvars import ContextVar
 from datetime import datetime
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .cache import forget_comments, invalidate_home_page
+
+MODERATE_BATCH = 500
+# Пока moderate() удаляет пачку, обработчики сигналов по строкам молчат:
+# фрагменты и главную он сбрасывает сам, один раз на пачку и на вызов.
+bulk_moderation = ContextVar('bulk_moderation', default=False)
+
+
+class NewsQuerySet(models.QuerySet):
+
+    def change_comment_count(self, delta):
+        """Сдвигает счётчик комментариев одним UPDATE без чтения строк."""
+        return self.update(comment_count=F('comment_count') + delta)
+
+    def recount_comments(self):
+        """Пересчитывает счётчик комментариев по таблице комментариев."""
+        comments = Comment.objects.visible().filter(
+            news=OuterRef('pk')
+        ).order_by().values('news').annotate(total=Count('pk')).values('total')
+        return self.update(comment_count=Coalesce(Subquery(comments), 0))
+
+    def fingerprints(self):
+        """Всё, от чего зависит страница новости, — строка на новость.
+
+        Счётчик меняется при добавлении, удалении и скрытии
+        комментария, Comment.modified — при правке. Последняя правка
+        берётся одной строкой индекса (news, modified), а не агрегатом
+        по всему обсуждению.
+        """
+        last_comment = Comment.objects.filter(
+            news=OuterRef('pk')
+        ).order_by('-modified').values('modified')[:1]
+        return self.order_by('pk').values_list(
+            'title', 'text', 'date', 'comment_count'
+        ).annotate(last_comment=Subquery(last_comment))
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
     date = models.DateField(default=datetime.today)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = NewsQuerySet.as_manager()
 
     class Meta:
         ordering = ('-date',)
+        indexes = (
+            models.Index(fields=('date', 'id'), name='news_date_id_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
@@ -18,6 +63,61 @@ class News(models.Model):
         return self.title
 
 
+class CommentQuerySet(models.QuerySet):
+
+    def visible(self):
+        """Комментарии, которые не скрыла модерация."""
+        return self.filter(is_hidden=False)
+
+    def moderate(self, action):
+        """Скрывает (hide) или удаляет (delete) комментарии выборки.
+
+        Условия выборки, в том числе на автора, проверяет сама база.
+        Выборка обходится по pk пачками по MODERATE_BATCH без чтения
+        всех строк сразу. Удаление идёт обычным delete(), но обработчики
+        сигналов по строкам на это время выключены: фрагменты пачки
+        уходят из кэша одним delete_many, главная сбрасывается один раз.
+        Счётчики затронутых новостей пересчитываются в конце.
+        Возвращает число скрытых или удалённых.
+        """
+        count, last_pk, news_ids = 0, None, set()
+        with transaction.atomic():
+            while True:
+                rows = self.select_related(None).order_by('pk').only(
+                    'pk', 'news_id', 'modified'
+                )
+                if last_pk is not None:
+                    rows = rows.filter(pk__gt=last_pk)
+                rows = list(rows[:MODERATE_BATCH])
+                if not rows:
+                    break
+                last_pk = rows[-1].pk
+                news_ids.update(row.news_id for row in rows)
+                batch = self.model.objects.filter(
+                    pk__in=[row.pk for row in rows]
+                )
+                if action == 'hide':
+                    count += batch.filter(is_hidden=False).update(
+                        is_hidden=True
+                    )
+                    continue
+                forget_comments(rows)
+                token = bulk_moderation.set(True)
+                try:
+                    count += batch.delete()[1].get(
+                        self.model._meta.label, 0
+                    )
+                finally:
+                    bulk_moderation.reset(token)
+            news_ids = sorted(news_ids)
+            for start in range(0, len(news_ids), MODERATE_BATCH):
+                News.objects.filter(
+                    pk__in=news_ids[start:start + MODERATE_BATCH]
+                ).recount_comments()
+            transaction.on_commit(invalidate_home_page)
+        return count
+
+
 class Comment(models.Model):
     news = models.ForeignKey(
         News,
@@ -29,9 +129,26 @@ class Comment(models.Model):
     )
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
+    is_flagged = models.BooleanField(default=False)
+    is_hidden = models.BooleanField(default=False)
+
+    objects = CommentQuerySet.as_manager()
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='comment_news_created_id_idx',
+            ),
+            models.Index(
+                fields=('author', 'id'), name='comment_author_id_idx'
+            ),
+            models.Index(
+                fields=('news', 'modified'), name='comment_news_modified_idx'
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
@@ -0,0 +1,180 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+class KeysetPage:
+    """Страница выборки, границы которой заданы курсорами."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Пагинация по ключу сортировки (seek) вместо OFFSET.
+
+    Страница ищется условием «строго после ключа последней строки»,
+    поэтому глубокие страницы стоят столько же, сколько первая.
+    Последнее поле в ordering должно быть уникальным (обычно pk).
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset.order_by(*ordering)
+        self.fields = [
+            (name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+        self.per_page = per_page
+
+    def _model_field(self, name):
+        opts = self.queryset.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def encode_cursor(self, key, forward=True):
+        payload = json.dumps({'k': list(key), 'f': forward}, default=str)
+        return base64.urlsafe_b64encode(
+            payload.encode()
+        ).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Разбирает курсор из строки запроса; мусор превращается в 404."""
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(
+                (cursor + '=' * (-len(cursor) % 4)).encode()
+            ))
+            values = payload['k']
+            if len(values) != len(self.fields):
+                raise ValueError(cursor)
+            key = tuple(
+                self._model_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, values)
+            )
+            return key, bool(payload['f'])
+        except (
+            binascii.Error, KeyError, TypeError, ValueError, ValidationError
+        ):
+            raise Http404('Неверный курсор страницы.')
+
+    def _seek(self, key, forward, inclusive=False):
+        """Условие «после key» в направлении обхода (или равно key).
+
+        Лишняя граница по первому полю превращает обход индекса
+        с начала в поиск диапазона: на OR-условие по нескольким полям
+        SQLite индекс как диапазон не применяет.
+        """
+        names = [name for name, _ in self.fields]
+        condition = Q(**dict(zip(names, key))) if inclusive else None
+        for index, (name, descending) in enumerate(self.fields):
+            lookup = 'lt' if descending == forward else 'gt'
+            term = Q(
+                **dict(zip(names[:index], key[:index])),
+                **{f'{name}__{lookup}': key[index]}
+            )
+            condition = term if condition is None else condition | term
+        first, descending = self.fields[0]
+        bound = 'lte' if descending == forward else 'gte'
+        return Q(**{f'{first}__{bound}': key[0]}) & condition
+
+    def _keys(self, cursor, *extra):
+        """Курсор и запрос per_page + 1 строки после него.
+
+        Строка — ключ сортировки и поля extra.
+        """
+        key, forward = (None, True)
+        if cursor:
+            key, forward = self.decode_cursor(cursor)
+        queryset = self.queryset
+        if key is not None:
+            queryset = queryset.filter(self._seek(key, forward))
+        if not forward:
+            queryset = queryset.reverse()
+        keys = queryset.values_list(
+            *(name for name, _ in self.fields), *extra
+        )[:self.per_page + 1]
+        return key, forward, keys
+
+    def keys_query(self, cursor=None):
+        """Запрос ключей страницы, ещё не выполненный (для EXPLAIN)."""
+        return self._keys(cursor)[2]
+
+    def rows_query(self, first, last):
+        """Строки между ключами first и last включительно, без среза."""
+        return self.queryset.filter(
+            self._seek(first, forward=True, inclusive=True),
+            self._seek(last, forward=False, inclusive=True),
+        )
+
+    def page_values(self, cursor, *fields):
+        """Поля fields строк страницы одним запросом, без моделей.
+
+        Годится для отпечатка страницы (ETag): в выборку попадает
+        и лишняя строка, по которой видно, есть ли следующая страница.
+        """
+        return list(self._keys(cursor, *fields)[2])
+
+    def page_rows(self, cursor=None, *fields):
+        """Страница строками values_list без моделей, одним запросом.
+
+        Строка — ключ сортировки и за ним поля fields, в порядке показа.
+        Курсоры считаются так же, как в page().
+        """
+        key, forward, rows = self._keys(cursor, *fields)
+        rows = list(rows)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+        if not rows:
+            return KeysetPage(rows)
+        size = len(self.fields)
+        has_next = has_more if forward else key is not None
+        has_previous = key is not None if forward else has_more
+        return KeysetPage(
+            rows,
+            self.encode_cursor(rows[-1][:size], True) if has_next else None,
+            self.encode_cursor(rows[0][:size], False)
+            if has_previous else None,
+        )
+
+    def page(self, cursor=None):
+        """Возвращает страницу, следующую за курсором.
+
+        Сначала выбираются только ключи (per_page + 1 строка по индексу),
+        затем object_list задаётся диапазоном ключей без среза, так что
+        с ним можно работать как с обычным QuerySet.
+        """
+        page = self.page_rows(cursor)
+        keys = page.object_list
+        page.object_list = (
+            self.rows_query(keys[0], keys[-1]) if keys
+            else self.queryset.none()
+        )
+        return page
+
+
+class KeysetPaginationMixin:
+    """Подключает KeysetPaginator к ListView вместо OFFSET-пагинации."""
+    keyset_ordering = ('-pk',)
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, self.keyset_ordering, page_size)
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,136 @@
+import os
+import threading
+import unicodedata
+from collections import deque
+
+from django.conf import settings
+
+# Латинские буквы и цифры, которыми подменяют похожую кириллицу.
+LOOKALIKES = str.maketrans({
+    'ё': 'е',
+    'a': 'а',
+    'b': 'в',
+    'c': 'с',
+    'e': 'е',
+    'h': 'н',
+    'k': 'к',
+    'm': 'м',
+    'o': 'о',
+    'p': 'р',
+    't': 'т',
+    'x': 'х',
+    'y': 'у',
+    '0': 'о',
+    '3': 'з',
+})
+
+
+def normalize(text):
+    """Приводит текст к виду, в котором ищутся запрещённые слова.
+
+    NFKC убирает «широкие» и составные варианты символов, casefold
+    регистр, а таблица LOOKALIKES — подмену букв похожими.
+    """
+    return unicodedata.normalize('NFKC', text).casefold().translate(
+        LOOKALIKES
+    )
+
+
+class Matcher:
+    """Автомат Ахо — Корасик: все слова ищутся за один проход по тексту."""
+
+    def __init__(self, words):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]
+        for word in words:
+            self._add(normalize(word), word)
+        self._link()
+
+    def _add(self, pattern, word):
+        if not pattern:
+            return
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+            node = next_node
+        self._output[node] = word
+
+    def _link(self):
+        """Строит суффиксные ссылки обходом бора в ширину."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                if self._output[child] is None:
+                    self._output[child] = self._output[self._fail[child]]
+
+    def find(self, text):
+        """Возвращает первое найденное слово из списка или None."""
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for char in normalize(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node] is not None:
+                return output[node]
+        return None
+
+
+def read_words(path):
+    """Слова из файла: по одному в строке, # — комментарий."""
+    with open(path, encoding='utf-8') as words_file:
+        return [
+            line.strip() for line in words_file
+            if line.strip() and not line.lstrip().startswith('#')
+        ]
+
+
+class BadWordsFilter:
+    """Матчер по встроенному списку и файлу из settings.BAD_WORDS_FILE.
+
+    Автомат собирается один раз и пересобирается, только когда
+    у файла поменялось время изменения.
+    """
+
+    def __init__(self, words):
+        self.words = tuple(words)
+        self.all_words = self.words
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._matcher = Matcher(self.words)
+
+    def _file_stamp(self):
+        path = settings.BAD_WORDS_FILE
+        if not path:
+            return None
+        try:
+            return path, os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def get_matcher(self):
+        stamp = self._file_stamp()
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    extra = read_words(stamp[0]) if stamp else ()
+                    self.all_words = self.words + tuple(extra)
+                    self._matcher = Matcher(self.all_words)
+                    self._stamp = stamp
+        return self._matcher
+
+    def find(self, text):
+        return self.get_matcher().find(text)
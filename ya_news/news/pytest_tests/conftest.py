@@ -1,12 +1,23 @@
-from datetime import timedelta
+from types import SimpleNamespace
 
 import pytest
 from django.conf import settings
-from django.test.client import Client
+from django.core.cache import cache
+from django.db import transaction
 from django.urls import reverse
-from django.utils import timezone
 
+from news.middleware import user_cache
 from news.models import Comment, News
+from news.testing import logged_in_client
+
+from .factories import make_comments, make_news, make_users
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кэш страниц и пользователей не должен переходить из теста в тест."""
+    cache.clear()
+    user_cache.clear()
 
 
 @pytest.fixture
@@ -18,8 +29,10 @@ def news():
 @pytest.fixture
 def comment(author, news):
     """Создаёт один комментарий."""
-    return Comment.objects.create(text='Текст комментария', news=news,
-                                  author=author,)
+    comment = Comment.objects.create(text='Текст комментария', news=news,
+                                     author=author,)
+    News.objects.filter(id=news.id).change_comment_count(1)
+    return comment
 
 
 @pytest.fixture
@@ -47,6 +60,16 @@ def news_detail_url(news):
     return reverse('news:detail', args=(news.id,))
 
 
+@pytest.fixture
+def news_comments_url(news):
+    return reverse('news:comments', args=(news.id,))
+
+
+@pytest.fixture
+def news_search_url():
+    return reverse('news:search') + '?q=текст'
+
+
 @pytest.fixture
 def news_home_url():
     return reverse('news:home')
@@ -75,31 +98,36 @@ def login_url():
 @pytest.fixture
 def news_bulk():
     """Создаёт массив новостей с разными датами публикации и содержимим."""
-    now = timezone.now()
-    News.objects.bulk_create(
-        News(title=f'Новость {index}', text=f'Текст новости {index}',
-             date=now - timedelta(hours=index))
-        for index in range(settings.NEWS_COUNT_ON_HOME_PAGE + 1)
-    )
+    return make_news(settings.NEWS_COUNT_ON_HOME_PAGE + 1)
 
 
 @pytest.fixture
 def comments_bulk(news, author):
     """Создаёт массив комментариев с разными датами публикации и содержимим."""
-    now = timezone.now()
-    for index in range(10):
-        comment = Comment.objects.create(
-            news=news, author=author, text=f'Tекст комментария {index}',
-        )
-        comment.created = now - timedelta(hours=index)
-        comment.save()
+    return make_comments([news], [author], 10)
+
+
+@pytest.fixture(scope='module')
+def news_dataset(request, django_db_setup, django_db_blocker):
+    """Общий для тестов модуля набор новостей с комментариями.
+
+    Создаётся один раз на модуль внутри транзакции, которая
+    откатывается после последнего теста, поэтому тесты должны только
+    читать его. Объём умножается на --dataset-scale.
+    """
+    scale = request.config.getoption('dataset_scale')
+    with django_db_blocker.unblock():
+        with transaction.atomic():
+            authors = make_users(10 * scale, prefix='Читатель')
+            news = make_news(100 * scale)
+            make_comments(news, authors, 10)
+            yield SimpleNamespace(news=news, authors=authors)
+            transaction.set_rollback(True)
 
 
 @pytest.fixture
 def authenticated_client(db, user):
-    client = Client()
-    client.force_login(user)
-    return client
+    return logged_in_client(user)
 
 
 @pytest.fixture
@@ -114,13 +142,9 @@ def not_author(django_user_model):
 
 @pytest.fixture
 def author_client(author):
-    client = Client()
-    client.force_login(author)
-    return client
+    return logged_in_client(author)
 
 
 @pytest.fixture
 def not_author_client(not_author):
-    client = Client()
-    client.force_login(not_author)
-    return client
+    return logged_in_client(not_author)
@@ -0,0 +1,78 @@
+"""Быстрое создание данных для тестов: одна вставка на модель.
+
+Первичные ключи назначаются заранее, поэтому созданные объекты
+можно сразу связывать между собой и на SQLite, где bulk_create
+не возвращает id.
+"""
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Max
+from django.utils import timezone
+
+from news.models import Comment, News
+
+BATCH_SIZE = 1000
+
+
+def _with_pks(model, objects):
+    """Проставляет объектам id подряд после наибольшего в таблице."""
+    first = (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+    for pk, instance in enumerate(objects, start=first):
+        instance.pk = pk
+    return objects
+
+
+def _bulk_create(model, objects):
+    return model.objects.bulk_create(
+        _with_pks(model, list(objects)), batch_size=BATCH_SIZE
+    )
+
+
+@contextmanager
+def explicit_created():
+    """Разрешает задать Comment.created вместо текущего времени."""
+    field = Comment._meta.get_field('created')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def make_users(count, prefix='Пользователь'):
+    User = get_user_model()
+    return _bulk_create(User, (
+        User(username=f'{prefix} {index}') for index in range(count)
+    ))
+
+
+def make_news(count, start=None):
+    """Новости с убывающими по дню датами, начиная со start."""
+    start = start or timezone.now().date()
+    return _bulk_create(News, (
+        News(title=f'Новость {index}', text=f'Текст новости {index}',
+             date=start - timedelta(days=index))
+        for index in range(count)
+    ))
+
+
+def make_comments(news, authors, per_news, start=None):
+    """По per_news комментариев к каждой новости, от старых к новым.
+
+    Комментарии новости идут с шагом в час до start; авторы
+    чередуются. Счётчики комментариев пересчитываются одним запросом.
+    """
+    start = start or timezone.now()
+    with explicit_created():
+        comments = _bulk_create(Comment, (
+            Comment(news=item, author=authors[index % len(authors)],
+                    text=f'Текст комментария {index}',
+                    created=start - timedelta(hours=per_news - index))
+            for item in news for index in range(per_news)
+        ))
+    News.objects.filter(
+        pk__in=[item.pk for item in news]
+    ).recount_comments()
+    return comments
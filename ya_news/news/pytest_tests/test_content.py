@@ -1,8 +1,19 @@
-import pytest
+import json
+from http import HTTPStatus
 
+import pytest
+from asgiref.sync import async_to_sync
 from django.conf import settings
+from django.core.cache import cache
+from django.test.client import AsyncClient, Client
+from django.urls import reverse
+from pytest_lazyfixture import lazy_fixture
 
+from news.cache import comment_key, invalidate_home_page
 from news.forms import CommentForm
+from news.models import News
+from news.search import news_index
+from news.testing import assert_query_budget
 
 pytestmark = pytest.mark.django_db
 
@@ -33,6 +44,54 @@ def test_comments_order_on_news_page(client, comments_bulk, news_detail_url):
     assert timestamps == sorted(timestamps)
 
 
+def test_comments_loaded_by_pages(client, settings, news, comments_bulk,
+                                  news_detail_url):
+    """На странице новости только первая порция комментариев.
+
+    Остальные приходят фрагментами по курсору в порядке создания.
+    """
+    settings.COMMENTS_COUNT_ON_NEWS_PAGE = 4
+    context = client.get(news_detail_url).context
+    comments = list(context['comments'])
+    assert len(comments) == settings.COMMENTS_COUNT_ON_NEWS_PAGE
+    page = context['page_obj']
+    comments_url = reverse('news:comments', args=(news.id,))
+    while page.has_next():
+        context = client.get(
+            comments_url, {'cursor': page.next_cursor}
+        ).context
+        comments += list(context['comments'])
+        page = context['page_obj']
+    assert comments == list(news.comment_set.order_by('created', 'pk'))
+
+
+@pytest.mark.parametrize('backend', ('fts', 'fallback'))
+def test_news_search(client, news_bulk, backend, monkeypatch):
+    """Поиск находит новости по словам и префиксам, лучшие — первыми."""
+    if backend == 'fallback':
+        news_index.fallback.clear()
+        monkeypatch.setattr(news_index, 'backend',
+                            lambda queryset: news_index.fallback)
+    best = News.objects.create(title='Редкое слово',
+                               text='Редкое слово, снова редкое')
+    other = News.objects.create(title='Заголовок', text='Редкое явление')
+    search_url = reverse('news:search')
+    found = client.get(search_url, {'q': 'редк'}).context['object_list']
+    assert list(found) == [best, other]
+    found = client.get(search_url, {'q': 'Новость 3'}).context['object_list']
+    assert [news.title for news in found] == ['Новость 3']
+    news_index.fallback.clear()
+
+
+def test_news_search_scan_sees_bulk_updates(client, news, monkeypatch):
+    """Поиск по таблице видит изменения через update() без сигналов."""
+    monkeypatch.setattr(news_index, 'backend',
+                        lambda queryset: news_index.scan)
+    News.objects.filter(pk=news.pk).update(text='обновлённый текст')
+    found = client.get(reverse('news:search'), {'q': 'обновл'})
+    assert list(found.context['object_list']) == [news]
+
+
 # Анонимному пользователю недоступна форма для отправки
 #  комментария на странице отдельной новости, а авторизованному доступна.
 def test_comment_form_access_anonim(client, news_detail_url):
@@ -44,3 +103,231 @@ def test_comment_form_access_user(not_author_client, news, news_detail_url):
     response = not_author_client.get(news_detail_url)
     assert 'form' in response.context
     assert isinstance(response.context['form'], CommentForm)
+
+
+def test_news_cursor_pagination(news_home_url, client, news_bulk):
+    """По курсорам обходятся все новости без повторов и пропусков."""
+    first_page = client.get(news_home_url).context
+    assert not first_page['page_obj'].has_previous()
+    cursor = first_page['page_obj'].next_cursor
+    second_page = client.get(news_home_url, {'cursor': cursor}).context
+    ids = [news.id for news in first_page['object_list']]
+    ids += [news.id for news in second_page['object_list']]
+    assert len(ids) == len(set(ids)) == settings.NEWS_COUNT_ON_HOME_PAGE + 1
+    assert not second_page['page_obj'].has_next()
+    cursor = second_page['page_obj'].previous_cursor
+    back_page = client.get(news_home_url, {'cursor': cursor}).context
+    assert (list(back_page['object_list'])
+            == list(first_page['object_list']))
+
+
+def test_home_page_cached_for_anonymous(news_home_url, client, news,
+                                        django_capture_on_commit_callbacks):
+    """Главная для анонима берётся из кэша до изменения новостей."""
+    first_response = client.get(news_home_url)
+    cached_response = client.get(news_home_url)
+    assert cached_response.context is None
+    assert cached_response.content == first_response.content
+    with django_capture_on_commit_callbacks(execute=True):
+        News.objects.create(title='Свежая новость', text='Текст')
+    assert 'Свежая новость' in client.get(news_home_url).content.decode()
+
+
+def test_news_bad_cursor(news_home_url, client):
+    """Испорченный курсор даёт 404, а не ошибку сервера."""
+    assert client.get(
+        news_home_url, {'cursor': 'not-a-cursor'}
+    ).status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.parametrize('url', (
+    lazy_fixture('news_home_url'),
+    lazy_fixture('news_detail_url'),
+    lazy_fixture('news_comments_url'),
+    lazy_fixture('news_search_url'),
+))
+def test_hot_views_query_budget(author_client, url, news_bulk, comments_bulk):
+    """Горячие страницы укладываются в бюджет запросов и без N+1."""
+    assert_query_budget(author_client.get(url))
+
+
+def test_home_page_on_dataset(not_author_client, news_home_url,
+                              news_dataset):
+    """На большом наборе данных главная так же укладывается в бюджет."""
+    response = not_author_client.get(news_home_url)
+    assert_query_budget(response)
+    assert ([news.id for news in response.context['object_list']]
+            == [news.id for news in
+                news_dataset.news[:settings.NEWS_COUNT_ON_HOME_PAGE]])
+
+
+def test_news_detail_on_dataset(not_author_client, news_dataset):
+    """Страница новости с комментариями укладывается в бюджет запросов."""
+    news = news_dataset.news[0]
+    response = not_author_client.get(reverse('news:detail', args=(news.id,)))
+    assert_query_budget(response)
+    assert response.context['news'].comment_count == 10
+    assert len(response.context['comments']) == 10
+
+
+def auth_queries(response):
+    """Запросы к сессиям и пользователю, которые делает аутентификация."""
+    return [sql for sql in response.query_stats.fingerprints
+            if 'FROM "django_session"' in sql
+            or sql.startswith('SELECT "auth_user".')]
+
+
+def test_cached_sessions_and_users(settings, author, news_detail_url):
+    """С cached_db и кэшем пользователей вход не стоит запросов к базе.
+
+    Изменение пользователя сбрасывает его запись в кэше.
+    """
+    settings.SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    settings.USER_CACHE_SIZE = 10
+    client = Client()
+    client.force_login(author)
+    assert auth_queries(client.get(news_detail_url))
+    response = client.get(news_detail_url)
+    assert not auth_queries(response)
+    assert response.context['user'] == author
+    author.first_name = 'Новое имя'
+    author.save()
+    response = client.get(news_detail_url)
+    assert response.context['user'].first_name == 'Новое имя'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_read_views(settings, news_bulk):
+    """Async-варианты главной и новости отдают то же, что синхронные."""
+    settings.ROOT_URLCONF = 'yanews.urls_async'
+    news = news_bulk[0]
+    urls = (reverse('news:home'), reverse('news:detail', args=(news.id,)))
+
+    async def get(url):
+        return await AsyncClient().get(url)
+
+    responses = [async_to_sync(get)(url) for url in urls]
+    for response in responses:
+        assert response.status_code == HTTPStatus.OK
+        assert response.query_stats.count
+        assert_query_budget(response)
+    assert news.title in responses[0].content.decode()
+    assert news.text in responses[1].content.decode()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_query_stats_disabled(settings, news):
+    """Без QUERY_STATS_ENABLED запросы не считаются ни в одной цепочке."""
+    settings.QUERY_STATS_ENABLED = False
+    url = reverse('news:detail', args=(news.id,))
+    response = Client().get(url)
+    settings.ROOT_URLCONF = 'yanews.urls_async'
+
+    async def get(url):
+        return await AsyncClient().get(url)
+
+    async_response = async_to_sync(get)(url)
+    for response in (response, async_response):
+        assert response.status_code == HTTPStatus.OK
+        assert not hasattr(response, 'query_stats')
+        assert 'X-DB-Query-Count' not in response
+
+
+def test_comment_html_from_cache(author_client, comment, news_detail_url,
+                                 edit_url):
+    """HTML комментария берётся из кэша до его правки.
+
+    Ссылки автора на правку и удаление во фрагмент не входят.
+    """
+    author_client.get(news_detail_url)
+    assert cache.get(comment_key(comment))
+    cache.set(comment_key(comment), 'HTML из кэша')
+    content = author_client.get(news_detail_url).content.decode()
+    assert 'HTML из кэша' in content
+    assert edit_url in content
+    author_client.post(edit_url, data={'text': 'Исправленный текст'})
+    content = author_client.get(news_detail_url).content.decode()
+    assert 'HTML из кэша' not in content
+    assert 'Исправленный текст' in content
+    assert cache.get(comment_key(comment)) is None
+
+
+def test_news_detail_not_modified(author_client, not_author_client, comment,
+                                  news_detail_url, edit_url):
+    """Повторный запрос с тем же ETag получает 304 без тела.
+
+    ETag меняется при правке комментария и зависит от пользователя
+    и его cookie CSRF: первый ответ её только выдаёт.
+    """
+    author_client.get(news_detail_url)
+    etag = author_client.get(news_detail_url)['ETag']
+    response = author_client.get(news_detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert not response.content
+    assert not_author_client.get(news_detail_url)['ETag'] != etag
+    csrf_cookie = author_client.cookies[settings.CSRF_COOKIE_NAME].value
+    author_client.cookies[settings.CSRF_COOKIE_NAME] = 'x' * 64
+    response = author_client.get(news_detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    author_client.cookies[settings.CSRF_COOKIE_NAME] = csrf_cookie
+    author_client.post(edit_url, data={'text': 'Исправленный текст'})
+    response = author_client.get(news_detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+
+
+def test_home_page_not_modified(client, author_client, news_home_url,
+                                news_bulk, django_assert_num_queries):
+    """Аноним получает 304 и ETag из кэша главной без запросов к базе.
+
+    Для вошедшего ETag считается по счётчикам новостей страницы.
+    """
+    etag = client.get(news_home_url)['ETag']
+    with django_assert_num_queries(0):
+        response = client.get(news_home_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert client.get(news_home_url)['ETag'] == etag
+    invalidate_home_page()
+    response = client.get(news_home_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    etag = author_client.get(news_home_url)['ETag']
+    News.objects.filter(pk=news_bulk[0].pk).change_comment_count(1)
+    response = author_client.get(news_home_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+
+
+def api_json(client, url, **params):
+    response = client.get(url, params)
+    assert_query_budget(response)
+    return json.loads(b''.join(response.streaming_content))
+
+
+def test_news_api_list(client, news_bulk):
+    """API отдаёт выбранные поля новостей в порядке главной по курсору."""
+    url = reverse('news:api_list')
+    first = api_json(client, url, limit=6, fields='id,title')
+    assert first['previous'] is None
+    assert set(first['results'][0]) == {'id', 'title'}
+    second = api_json(client, url, limit=6, cursor=first['next'])
+    ids = [row['id'] for row in first['results'] + second['results']]
+    assert ids == list(News.objects.order_by('-date', '-pk').values_list(
+        'id', flat=True
+    )[:12])
+    response = client.get(url, {'fields': 'title,secret'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert 'secret' in response.json()['error']
+
+
+def test_news_api_detail(client, news, comments_bulk):
+    """API новости отдаёт её и комментарии от старых к новым."""
+    url = reverse('news:api_detail', args=(news.id,))
+    data = api_json(client, url, limit=4, comment_fields='id,author')
+    assert data['news']['title'] == news.title
+    assert data['results'] == [
+        {'id': comment.id, 'author': comment.author.username}
+        for comment in comments_bulk[:4]
+    ]
+    rest = api_json(client, url, limit=10, cursor=data['next'])
+    assert len(rest['results']) == len(comments_bulk) - 4
+    missing = reverse('news:api_detail', args=(news.id + 1,))
+    assert client.get(missing).status_code == HTTPStatus.NOT_FOUND
@@ -1,10 +1,23 @@
 import http
+import io
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
 
 import pytest
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError
+from django.db.models import Max, OuterRef, Subquery
+from django.urls import reverse
 from pytest_django.asserts import assertFormError
 
-from news.forms import BAD_WORDS, WARNING
-from news.models import Comment
+from news import buffer, models
+from news.buffer import CommentWriteBuffer
+from news.cache import comment_key, with_rendered_html
+from news.forms import BAD_WORDS, RATE_WARNING, WARNING
+from news.management.commands import check_query_plans
+from news.models import Comment, News
+from news.routers import PRIMARY_PIN_COOKIE, ReplicaRouter, replica_reads
 
 
 pytestmark = pytest.mark.django_db
@@ -40,6 +53,61 @@ def test_authenticated_user_can_submit_comment(author_client,
     assert new_comment.news == news
     assert new_comment.author == author
     assert new_comment.text == COMMENT['text']
+    assert News.objects.get(id=news.id).comment_count == 1
+
+
+# Сверх лимита комментарии отклоняются с 429, пока ведро не пополнится.
+def test_comment_rate_limit(settings, author_client, news_detail_url):
+    settings.COMMENT_RATE_BURST = 2
+    # Отклонённые фильтром комментарии лимит не расходуют.
+    for _ in range(settings.COMMENT_RATE_BURST + 1):
+        response = author_client.post(
+            news_detail_url, {'text': f'Это {BAD_WORDS[0]} текст'}
+        )
+        assert response.status_code == http.HTTPStatus.OK
+    for _ in range(settings.COMMENT_RATE_BURST):
+        response = author_client.post(news_detail_url, data=COMMENT)
+        assert response.status_code == http.HTTPStatus.FOUND
+    response = author_client.post(news_detail_url, data=COMMENT)
+    assert response.status_code == http.HTTPStatus.TOO_MANY_REQUESTS
+    assertFormError(response, 'form', None, errors=(RATE_WARNING))
+    assert Comment.objects.count() == settings.COMMENT_RATE_BURST
+
+
+# С групповой записью автор сразу после редиректа видит комментарий.
+@pytest.mark.django_db(transaction=True)
+def test_buffered_comment_visible_after_redirect(
+        settings, author_client, news_detail_url, news):
+    settings.COMMENT_WRITE_BUFFER = True
+    response = author_client.post(news_detail_url, data=COMMENT)
+    assert response.status_code == http.HTTPStatus.FOUND
+    assert Comment.objects.filter(news=news, text=COMMENT['text']).exists()
+    assert News.objects.get(pk=news.pk).comment_count == 1
+
+
+# Не дождавшийся записи комментарий снимается с очереди, дубля не будет.
+def test_comment_buffer_cancels_timed_out_comment(news, author, monkeypatch):
+    monkeypatch.setattr(buffer, 'WRITE_TIMEOUT', 0.01)
+    writer = CommentWriteBuffer()
+    monkeypatch.setattr(writer, 'start', lambda: None)
+    with pytest.raises(FutureTimeout):
+        writer.save(Comment(news=news, author=author, text='Поздний'))
+    assert writer.collect() == []
+    assert Comment.objects.count() == 0
+
+
+# Ошибка одного комментария не роняет остальные комментарии пачки.
+def test_comment_buffer_isolates_failed_comment(news, author):
+    good = Comment(news=news, author=author, text='Хороший')
+    bad = Comment(news_id=news.pk, author_id=None, text='Без автора')
+    batch = [(good, Future()), (bad, Future())]
+    CommentWriteBuffer().write(batch)
+    assert batch[0][1].result() is None
+    assert isinstance(batch[1][1].exception(), IntegrityError)
+    assert list(Comment.objects.values_list('text', flat=True)) == [
+        good.text
+    ]
+    assert News.objects.get(pk=news.pk).comment_count == 1
 
 
 @pytest.mark.parametrize(
@@ -54,6 +122,30 @@ def test_form_refuses_bad_words(author_client, news_detail_url, test_data):
     assert Comment.objects.count() == 0
 
 
+# Подмена букв похожими латинскими и регистр не спасают от фильтра.
+@pytest.mark.parametrize(
+    'text', ('Это РЕДИСКА', 'Это peдиcкa', 'Какой нeгoдяй!')
+)
+def test_form_refuses_disguised_bad_words(author_client, news_detail_url,
+                                          text):
+    assertFormError(
+        author_client.post(news_detail_url, {'text': text}),
+        'form', 'text', errors=(WARNING))
+    assert Comment.objects.count() == 0
+
+
+# Слова из внешнего файла подхватываются при его изменении.
+def test_bad_words_file_is_reloaded(author_client, news_detail_url,
+                                    settings, tmp_path):
+    words_file = tmp_path / 'bad_words.txt'
+    words_file.write_text('# Модерация\nжулик\n', encoding='utf-8')
+    settings.BAD_WORDS_FILE = str(words_file)
+    assertFormError(
+        author_client.post(news_detail_url, {'text': 'Ну ты жулик'}),
+        'form', 'text', errors=(WARNING))
+    assert Comment.objects.count() == 0
+
+
 # Авторизованный пользователь может редактировать свои комментарии.
 def test_authenticated_user_can_edit_own_comment(
         author_client, comment, edit_url):
@@ -72,6 +164,7 @@ def test_authenticated_user_can_delete_own_comment(
     author_client.delete(delete_url)
     assert comments_count - Comment.objects.all().count() == 1
     assert not Comment.objects.filter(id=comment.id).exists()
+    assert News.objects.get(id=comment.news.id).comment_count == 0
 
 
 # Пользователь не может удалить чужой комментарий."""
@@ -94,3 +187,152 @@ def test_user_cannot_edit_comment(not_author_client, comment,
     assert comment.news == attempt_comment.news
     assert comment.author == attempt_comment.author
     assert comment.text == attempt_comment.text
+
+
+# Команда пересчёта восстанавливает счётчик комментариев.
+def test_recount_comments_command(news, comments_bulk):
+    News.objects.update(comment_count=0)
+    call_command('recount_comments')
+    assert News.objects.get(id=news.id).comment_count == 10
+
+
+@pytest.mark.parametrize('action, workers, field', (
+    ('flag', 0, 'is_flagged'), ('hide', 0, 'is_hidden'), ('delete', 2, None),
+))
+# Пересканирование находит старые комментарии с запрещёнными словами.
+def test_rescan_comments_command(news, author, action, workers, field):
+    clean = Comment.objects.create(
+        news=news, author=author, text='Хороший текст'
+    )
+    bad = Comment.objects.create(
+        news=news, author=author, text=f'Ты {BAD_WORDS[0]}!'
+    )
+    News.objects.recount_comments()
+    call_command('rescan_comments', action=action, workers=workers,
+                 chunk_size=1, stdout=io.StringIO())
+    comments = {comment.id: comment for comment in Comment.objects.all()}
+    assert not comments[clean.id].is_flagged
+    assert not comments[clean.id].is_hidden
+    if field is None:
+        assert bad.id not in comments
+    else:
+        assert getattr(comments[bad.id], field)
+    expected_count = 2 if action == 'flag' else 1
+    assert News.objects.get(id=news.id).comment_count == expected_count
+
+
+@pytest.mark.parametrize('action', ('hide', 'delete'))
+# Автор скрывает или удаляет пачку своих комментариев, чужие не трогаются.
+def test_bulk_moderate_own_comments(author_client, news, not_author,
+                                    comments_bulk, action, monkeypatch):
+    # Несколько пачек даже на маленькой выборке.
+    monkeypatch.setattr(models, 'MODERATE_BATCH', 3)
+    alien = Comment.objects.create(news=news, author=not_author, text='Чужой')
+    News.objects.recount_comments()
+    ids = [comment.id for comment in comments_bulk[:4]] + [alien.id]
+    response = author_client.post(reverse('news:bulk'), {
+        'action': action, 'ids': ','.join(map(str, ids)),
+    })
+    assert response.json() == {'action': action, 'count': 4}
+    left = Comment.objects.visible().filter(news=news)
+    assert alien in left
+    assert left.count() == len(comments_bulk) + 1 - 4
+    assert News.objects.get(pk=news.pk).comment_count == left.count()
+
+
+# Удаление пачкой сбрасывает главную один раз и фрагменты без сигналов.
+def test_bulk_delete_forgets_fragments_once(
+        comments_bulk, monkeypatch, django_capture_on_commit_callbacks):
+    monkeypatch.setattr(models, 'MODERATE_BATCH', 4)
+    with_rendered_html(comments_bulk)
+    keys = [comment_key(comment) for comment in comments_bulk]
+    assert len(cache.get_many(keys)) == len(comments_bulk)
+    with django_capture_on_commit_callbacks() as callbacks:
+        Comment.objects.all().moderate('delete')
+    assert len(callbacks) == 1
+    assert cache.get_many(keys) == {}
+    assert not Comment.objects.exists()
+
+
+# Без действия или с нечисловыми id запрос отклоняется целиком.
+def test_bulk_moderate_invalid(author_client, comment):
+    for data in ({'ids': comment.id}, {'action': 'hide', 'ids': '1,x'}):
+        response = author_client.post(reverse('news:bulk'), data)
+        assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    assert Comment.objects.get(pk=comment.pk).is_hidden is False
+
+
+# Модератор скрывает выбранные комментарии действием в админке.
+def test_admin_hide_comments(admin_client, news, comments_bulk):
+    admin_client.post(reverse('admin:news_comment_changelist'), {
+        'action': 'hide_comments',
+        '_selected_action': [comment.id for comment in comments_bulk[:3]],
+    })
+    assert Comment.objects.filter(is_hidden=True).count() == 3
+    assert News.objects.get(pk=news.pk).comment_count == (
+        len(comments_bulk) - 3
+    )
+
+
+# Горячие запросы идут по индексам; запрос без индекса или агрегат
+# по всему обсуждению роняют проверку.
+def test_check_query_plans_command(monkeypatch):
+    output = io.StringIO()
+    call_command('check_query_plans', stdout=output)
+    assert 'МЕДЛЕННО' not in output.getvalue()
+    monkeypatch.setattr(
+        check_query_plans, 'hot_queries',
+        lambda: {'по тексту': News.objects.filter(text='Текст')},
+    )
+    with pytest.raises(CommandError, match='по тексту'):
+        call_command('check_query_plans', stdout=io.StringIO())
+    last_comment = Comment.objects.filter(
+        news=OuterRef('pk')
+    ).order_by().values('news').annotate(last=Max('modified')).values('last')
+    monkeypatch.setattr(
+        check_query_plans, 'hot_queries',
+        lambda: {'агрегат по обсуждению': News.objects.filter(pk=1).annotate(
+            last_comment=Subquery(last_comment)
+        )},
+    )
+    with pytest.raises(CommandError, match='агрегат по обсуждению'):
+        call_command('check_query_plans', stdout=io.StringIO())
+
+
+# Чтение по кругу идёт на живые реплики и только в помеченных запросах;
+# пользователи всегда читаются из основной базы.
+def test_replica_router_round_robin(settings, monkeypatch,
+                                    django_user_model):
+    settings.DATABASE_REPLICAS = ['first', 'second', 'third']
+    router = ReplicaRouter()
+    monkeypatch.setattr(router, 'is_healthy', lambda alias: alias != 'second')
+    assert router.db_for_read(News) == 'default'
+    token = replica_reads.set(True)
+    try:
+        assert [router.db_for_read(News) for _ in range(3)] == [
+            'first', 'third', 'third'
+        ]
+        assert router.db_for_read(django_user_model) == 'default'
+        monkeypatch.setattr(router, 'is_healthy', lambda alias: False)
+        assert router.db_for_read(News) == 'default'
+    finally:
+        replica_reads.reset(token)
+    assert router.db_for_write(News) == 'default'
+
+
+# После комментария автор читает из основной базы.
+def test_reads_pinned_to_primary_after_comment(
+        settings, monkeypatch, author_client, news_detail_url):
+    settings.DATABASE_REPLICAS = ['default']
+    checked = []
+    monkeypatch.setattr(
+        ReplicaRouter, 'is_healthy',
+        lambda self, alias: checked.append(alias) or True
+    )
+    author_client.get(news_detail_url)
+    assert checked
+    response = author_client.post(news_detail_url, data=COMMENT)
+    assert PRIMARY_PIN_COOKIE in response.cookies
+    checked.clear()
+    author_client.get(news_detail_url)
+    assert not checked
@@ -0,0 +1,35 @@
+import time
+
+from django.core.cache import caches
+
+
+class TokenBucket:
+    """Маркерное ведро в кэше: burst действий подряд, дальше rate в секунду.
+
+    Состояние ключа — число маркеров и время последнего пополнения.
+    Кэш не умеет сравнение с обменом, поэтому параллельные запросы
+    одного ключа изредка пропускают лишнее действие; для защиты от
+    всплесков этого достаточно, а общий кэш ограничивает все процессы.
+    """
+
+    def __init__(self, prefix, rate, burst, cache_alias='default'):
+        self.prefix = prefix
+        self.rate = rate
+        self.burst = burst
+        self.cache_alias = cache_alias
+
+    def allow(self, *parts):
+        """Забирает маркер для ключа parts; False, если маркеров нет."""
+        cache = caches[self.cache_alias]
+        key = ':'.join((self.prefix, *map(str, parts)))
+        now = time.time()
+        tokens, updated = cache.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        # Полное ведро не хранится: через это время оно снова полное.
+        cache.set(
+            key, (tokens, now), int((self.burst - tokens) / self.rate) + 1
+        )
+        return allowed
@@ -0,0 +1,70 @@
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+# Включается ReplicaReadsMiddleware на время GET-запроса к view
+# с read_replica = True; в остальных случаях чтение идёт в default.
+replica_reads = ContextVar('replica_reads', default=False)
+
+# Cookie, с которой автор после записи читает из основной базы.
+PRIMARY_PIN_COOKIE = 'primary_pin'
+
+# Пользователи и сессии всегда читаются из основной базы: с отстающей
+# реплики новый вход или смена пароля видны не сразу.
+PRIMARY_APPS = {'auth', 'sessions', 'contenttypes'}
+
+
+class ReplicaRouter:
+    """Чтение — с реплик DATABASE_REPLICAS по кругу, запись — в default.
+
+    Реплика, не ответившая на проверку, выпадает из круга до следующей
+    проверки через REPLICA_HEALTH_CHECK_SECONDS. Если живых реплик нет,
+    чтение идёт в основную базу.
+    """
+
+    def __init__(self):
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self._health = {}
+
+    def is_healthy(self, alias):
+        healthy, checked_at = self._health.get(alias, (True, None))
+        now = time.monotonic()
+        if (checked_at is not None
+                and now - checked_at < settings.REPLICA_HEALTH_CHECK_SECONDS):
+            return healthy
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+            healthy = True
+        except DatabaseError:
+            healthy = False
+        self._health[alias] = (healthy, now)
+        return healthy
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or not replica_reads.get()
+                or model._meta.app_label in PRIMARY_APPS):
+            return 'default'
+        with self._lock:
+            start = next(self._turn)
+        for shift in range(len(replicas)):
+            alias = replicas[(start + shift) % len(replicas)]
+            if self.is_healthy(alias):
+                return alias
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from .cache import forget_comment, invalidate_home_page
+from .middleware import user_cache
+from .models import Comment, News, bulk_moderation
+from .search import news_index
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def news_changed(**kwargs):
+    """Сбрасывает кэш главной после фиксации транзакции.
+
+    Если сбросить раньше, параллельный запрос успеет положить в кэш
+    под новой версией страницу со старыми данными. Массовая модерация
+    сбрасывает главную сама, один раз на весь вызов.
+    """
+    if bulk_moderation.get():
+        return
+    transaction.on_commit(invalidate_home_page)
+
+
+@receiver(pre_save, sender=Comment)
+@receiver(pre_delete, sender=Comment)
+def forget_comment_fragment(instance, **kwargs):
+    """Убирает из кэша HTML комментария перед правкой или удалением.
+
+    Ключ со старым Comment.modified после сохранения и так не читается,
+    удаление только освобождает место в кэше. Массовая модерация
+    убирает фрагменты сама, пачкой.
+    """
+    if bulk_moderation.get():
+        return
+    if instance.pk is not None and instance.modified is not None:
+        forget_comment(instance)
+
+
+@receiver(post_save, sender=News)
+def index_news(instance, **kwargs):
+    news_index.fallback.update(instance)
+
+
+@receiver(post_delete, sender=News)
+def unindex_news(instance, **kwargs):
+    news_index.fallback.remove(instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_user(instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(connection_created)
+def configure_sqlite(connection, **kwargs):
+    """Применяет SQLITE_PRAGMAS к каждому новому соединению с SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,21 @@
+"""Те же адреса, что в news.urls, но страницы чтения — async-view.
+
+Подключается в yanews.urls_async вместо news.urls при ASYNC_VIEWS = True.
+"""
+from django.urls import path
+
+from news import urls as sync_urls, views
+from news.async_views import pooled
+
+app_name = sync_urls.app_name
+
+ASYNC_VIEWS = {
+    'home': pooled(views.NewsList),
+    'detail': pooled(views.NewsDetailView),
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name], name=pattern.name)
+    if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in sync_urls.urlpatterns
+]
@@ -1,39 +1,133 @@
+from http import HTTPStatus
+
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.views import generic
 
-from .forms import CommentForm
+from .buffer import comment_buffer
+from .cache import (
+    get_cache, home_page_key, home_version, with_rendered_html
+)
+from .conditional import ConditionalGetMixin
+from .forms import RATE_WARNING, CommentBulkForm, CommentForm
 from .models import Comment, News
+from .pagination import KeysetPaginationMixin, KeysetPaginator
+from .ratelimit import TokenBucket
+from .search import news_index
+
 
+class NewsList(
+        ConditionalGetMixin, KeysetPaginationMixin, generic.ListView
+):
+    """Список новостей.
 
-class NewsList(generic.ListView):
-    """Список новостей."""
+    На странице выводится несколько последних новостей, их количество
+    определяется в настройках проекта. Дальше листаем по курсору.
+    Число комментариев берётся из денормализованного счётчика.
+    """
     model = News
     template_name = 'news/home.html'
+    paginate_by = settings.NEWS_COUNT_ON_HOME_PAGE
+    keyset_ordering = ('-date', '-pk')
+    query_budget = 4
+    read_replica = True
 
-    def get_queryset(self):
+    def get_etag_data(self):
+        """Версия главной и счётчики комментариев новостей страницы.
+
+        Правка новости поднимает версию главной (см. news.signals),
+        поэтому заголовки и тексты в отпечаток не входят.
         """
-        Выводим только несколько последних новостей.
+        return home_version(), KeysetPaginator(
+            self.get_queryset(), self.keyset_ordering, self.paginate_by
+        ).page_values(self.request.GET.get(self.cursor_kwarg), 'comment_count')
+
+    def dispatch(self, request, *args, **kwargs):
+        """Анонимам отдаём готовую страницу из кэша вместе с её ETag.
 
-        Их количество определяется в настройках проекта.
+        Попадание в кэш, в том числе ответ 304, обходится без запросов
+        к базе. Кэш сбрасывается сигналами при изменении новостей
+        и комментариев.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        if (request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated):
+            return super().dispatch(request, *args, **kwargs)
+        cache = get_cache()
+        key = home_page_key(request.GET.urlencode())
+        cached = cache.get(key)
+        if cached is not None:
+            content, etag = cached
+            response = HttpResponse(content)
+            response['ETag'] = etag
+            response = get_conditional_response(
+                request, etag=etag, response=response
+            )
+            patch_cache_control(response, no_cache=True)
+            return response
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == HTTPStatus.OK and response.has_header(
+            'ETag'
+        ):
+            response.add_post_render_callback(
+                lambda response: cache.set(
+                    key, (response.content, response['ETag']),
+                    settings.NEWS_HOME_CACHE_TIMEOUT,
+                )
+            )
+        return response
+
+
+class CommentPageMixin:
+    """Добавляет в контекст только первую страницу комментариев.
+
+    Остальные комментарии подгружаются фрагментами через NewsComments,
+    так что время ответа не зависит от длины обсуждения.
+    """
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = KeysetPaginator(
+            self.object.comment_set.visible().select_related('author'),
+            NewsComments.keyset_ordering,
+            settings.COMMENTS_COUNT_ON_NEWS_PAGE,
+        ).page()
+        context['comments'] = with_rendered_html(page.object_list)
+        context['page_obj'] = page
+        return context
+
+
+class NewsSearch(generic.ListView):
+    """Поиск по заголовкам и текстам новостей, по релевантности."""
+    template_name = 'news/search.html'
+    paginate_by = settings.NEWS_COUNT_ON_HOME_PAGE
+    query_budget = 5
+    read_replica = True
+
+    def get_queryset(self):
+        return news_index.search(self.request.GET.get('q', ''))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
 
 
-class NewsDetail(generic.DetailView):
+class NewsDetail(ConditionalGetMixin, CommentPageMixin, generic.DetailView):
     model = News
     template_name = 'news/detail.html'
 
-    def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
+    def get_etag_data(self):
+        return News.objects.filter(
             pk=self.kwargs['pk']
-        )
-        return obj
+        ).fingerprints().first()
+
+    def get_object(self, queryset=None):
+        return get_object_or_404(self.model, pk=self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -42,8 +136,31 @@ class NewsDetail(generic.DetailView):
         return context
 
 
+class NewsComments(KeysetPaginationMixin, generic.ListView):
+    """Следующая страница комментариев к новости в виде HTML-фрагмента."""
+    template_name = 'news/comments.html'
+    context_object_name = 'comments'
+    keyset_ordering = ('created', 'pk')
+    query_budget = 4
+    read_replica = True
+
+    def get_paginate_by(self, queryset):
+        return settings.COMMENTS_COUNT_ON_NEWS_PAGE
+
+    def get_queryset(self):
+        return Comment.objects.visible().filter(
+            news_id=self.kwargs['pk']
+        ).select_related('author')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['comments'] = with_rendered_html(context['comments'])
+        return context
+
+
 class NewsComment(
         LoginRequiredMixin,
+        CommentPageMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
@@ -55,19 +172,46 @@ class NewsComment(
         self.object = self.get_object()
         return super().post(request, *args, **kwargs)
 
+    def rate_limited(self):
+        """Исчерпал ли пользователь лимит комментариев к этой новости.
+
+        Проверяется только для прошедшей проверку формы: отклонённые
+        комментарии лимит не расходуют.
+        """
+        if settings.COMMENT_RATE_BURST is None:
+            return False
+        bucket = TokenBucket(
+            'news:comment-rate', settings.COMMENT_RATE_PER_MINUTE / 60,
+            settings.COMMENT_RATE_BURST,
+        )
+        return not bucket.allow(self.request.user.pk, self.object.pk)
+
     def form_valid(self, form):
+        if self.rate_limited():
+            form.add_error(None, RATE_WARNING)
+            response = self.form_invalid(form)
+            response.status_code = HTTPStatus.TOO_MANY_REQUESTS
+            return response
         comment = form.save(commit=False)
         comment.news = self.object
         comment.author = self.request.user
-        comment.save()
+        if settings.COMMENT_WRITE_BUFFER:
+            comment_buffer.save(comment)
+            return super().form_valid(form)
+        with transaction.atomic():
+            comment.save()
+            News.objects.filter(pk=self.object.pk).change_comment_count(1)
         return super().form_valid(form)
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return reverse(
+            'news:detail', kwargs={'pk': self.object.pk}
+        ) + '#comments'
 
 
 class NewsDetailView(generic.View):
+    query_budget = 5
+    read_replica = True
 
     def get(self, request, *args, **kwargs):
         view = NewsDetail.as_view()
@@ -83,9 +227,9 @@ class CommentBase(LoginRequiredMixin):
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
+        """Новость берётся из уже загруженного комментария."""
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
@@ -102,3 +246,32 @@ class CommentUpdate(CommentBase, generic.UpdateView):
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
+
+    def delete(self, request, *args, **kwargs):
+        with transaction.atomic():
+            response = super().delete(request, *args, **kwargs)
+            if not self.object.is_hidden:
+                News.objects.filter(
+                    pk=self.object.news_id
+                ).change_comment_count(-1)
+        return response
+
+
+class CommentBulk(CommentBase, generic.FormView):
+    """Скрытие или удаление многих своих комментариев одним запросом.
+
+    Принадлежность проверяется в SQL: id чужих комментариев просто
+    не попадают в выборку get_queryset().
+    """
+    form_class = CommentBulkForm
+    http_method_names = ['post']
+
+    def form_valid(self, form):
+        action = form.cleaned_data['action']
+        count = self.get_queryset().filter(
+            pk__in=form.cleaned_data['ids']
+        ).moderate(action)
+        return JsonResponse({'action': action, 'count': count})
+
+    def form_invalid(self, form):
+        return JsonResponse({'errors': form.errors}, status=400)
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -21,11 +22,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'news.middleware.QueryCountMiddleware',
+    'news.middleware.ReplicaReadsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'news.middleware.CachedUserMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -58,6 +62,14 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        # Помимо страниц здесь HTML отдельных комментариев.
+        'OPTIONS': {'MAX_ENTRIES': 10_000},
+    }
+}
+
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -80,3 +92,77 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+
+COMMENTS_COUNT_ON_NEWS_PAGE = 50
+
+# Частота комментариев одного пользователя к одной новости: до
+# COMMENT_RATE_BURST подряд, дальше COMMENT_RATE_PER_MINUTE в минуту.
+# None вместо COMMENT_RATE_BURST отключает ограничение.
+COMMENT_RATE_BURST = 5
+COMMENT_RATE_PER_MINUTE = 10
+
+# Групповая запись комментариев (news.buffer): запрос ждёт общую
+# транзакцию не дольше COMMENT_FLUSH_MS, в пачке до COMMENT_BATCH_SIZE.
+COMMENT_WRITE_BUFFER = os.environ.get(
+    'COMMENT_WRITE_BUFFER', ''
+).lower() in ('1', 'true', 'yes')
+COMMENT_FLUSH_MS = 5
+COMMENT_BATCH_SIZE = 500
+
+# Сколько комментариев можно скрыть или удалить одним запросом.
+COMMENTS_BULK_LIMIT = 10_000
+
+# JSON API: строк на странице по умолчанию и наибольшее число по ?limit=.
+NEWS_API_PAGE_SIZE = 100
+NEWS_API_MAX_PAGE_SIZE = 10_000
+
+# Кэш главной страницы для анонимных пользователей.
+NEWS_HOME_CACHE = 'default'
+NEWS_HOME_CACHE_TIMEOUT = 60
+# HTML отдельных комментариев в том же кэше.
+COMMENT_FRAGMENT_TIMEOUT = 24 * 60 * 60
+
+# Дополнительный список запрещённых слов, по слову в строке.
+# Перечитывается при изменении файла.
+BAD_WORDS_FILE = None
+
+# Учёт SQL-запросов каждого запроса к сайту. Если выключен,
+# QueryCountMiddleware снимается с цепочки при старте, а async-view
+# не ставят счётчик.
+QUERY_STATS_ENABLED = True
+# Заголовки X-DB-* со статистикой SQL-запросов в ответах.
+QUERY_STATS_HEADERS = True
+
+# Хранение сессий: db (по умолчанию) или cached_db — чтение из кэша
+# без запроса к базе.
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get(
+    'SESSION_BACKEND', 'db'
+)
+
+# Кэш пользователей в памяти процесса: число записей (0 — выключен)
+# и срок жизни записи в секундах.
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 0))
+USER_CACHE_TIMEOUT = int(os.environ.get('USER_CACHE_TIMEOUT', 60))
+
+# PRAGMA, которые выполняются при каждом подключении к SQLite.
+SQLITE_PRAGMAS = {}
+
+# Поиск без FTS5: индекс в памяти процесса или подстрокой по таблице.
+# Индекс в памяти обновляют только сигналы своего процесса, поэтому
+# он годится лишь для одного процесса — runserver и тестов.
+SEARCH_MEMORY_INDEX = True
+
+# Реплики для чтения: алиасы из DATABASES. Читают с них только
+# GET-запросы к view с read_replica = True (см. news.routers).
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['news.routers.ReplicaRouter']
+REPLICA_HEALTH_CHECK_SECONDS = 5
+# Сколько секунд после записи автор читает из основной базы.
+REPLICA_PIN_SECONDS = 10
+
+# Async-view для чтения под ASGI (news.urls_async) и размер пула
+# потоков, в котором они работают с базой.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '').lower() in ('1', 'true', 'yes')
+ASYNC_DB_THREADS = int(os.environ.get('ASYNC_DB_THREADS', 8))
+if ASYNC_VIEWS:
+    ROOT_URLCONF = 'yanews.urls_async'
@@ -0,0 +1,10 @@
+"""Корневой URLconf с async-view для чтения; выбирается при ASYNC_VIEWS."""
+from django.urls import include, path
+
+from yanews import urls
+
+urlpatterns = [
+    path('', include('news.urls_async')),
+    *(pattern for pattern in urls.urlpatterns
+      if getattr(pattern, 'app_name', None) != 'news'),
+]
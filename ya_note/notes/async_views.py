@@ -0,0 +1,57 @@
+"""Async-варианты view для запуска под ASGI.
+
+В Django 3.2 нет асинхронного ORM, поэтому синхронный view целиком,
+вместе с отрисовкой шаблона, выполняется в ограниченном пуле потоков
+ASYNC_DB_THREADS. Цикл событий в это время обслуживает другие
+запросы, а число одновременных обращений к базе не превышает
+размер пула.
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .middleware import QueryRecorder
+
+db_executor = ThreadPoolExecutor(
+    settings.ASYNC_DB_THREADS, thread_name_prefix='notes-db'
+)
+
+
+def _run(view, request, args, kwargs):
+    close_old_connections()
+    recorder = QueryRecorder() if settings.QUERY_STATS_ENABLED else None
+    try:
+        with recorder or nullcontext():
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+    finally:
+        close_old_connections()
+    if recorder is not None:
+        response.query_stats = recorder
+    return response
+
+
+def pooled(view_class, **initkwargs):
+    """Async-view, который выполняет view_class в пуле db_executor.
+
+    Контекст (например, выбор реплики для чтения) передаётся в поток.
+    Атрибуты класса вроде query_budget доступны через view_class.
+    """
+    sync_view = view_class.as_view(**initkwargs)
+
+    async def view(request, *args, **kwargs):
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            db_executor,
+            partial(context.run, _run, sync_view, request, args, kwargs),
+        )
+
+    view.view_class = view_class
+    view.view_initkwargs = initkwargs
+    return view
@@ -0,0 +1,163 @@
+import csv
+import json
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_slug
+from django.db import IntegrityError, transaction
+
+from .models import Note
+from .slugs import base_slug, free_slug, prefix_q, taken_prefix
+
+FIELDS = ('title', 'text', 'slug')
+FORMATS = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+BATCH_SIZE = 500
+IMPORT_ATTEMPTS = 3
+
+
+def parse_rows(lines, file_format):
+    """Номера строк и словари заметок из файла JSON Lines или CSV."""
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+        try:
+            for row in reader:
+                yield reader.line_num, check_row(reader.line_num, row)
+        except csv.Error as error:
+            raise ValueError(f'Строка {reader.line_num}: {error}')
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as error:
+            raise ValueError(f'Строка {number}: {error}')
+        if not isinstance(row, dict):
+            raise ValueError(f'Строка {number}: ожидается объект')
+        yield number, check_row(number, row)
+
+
+def check_row(number, row):
+    """Только известные поля и только строки в значениях.
+
+    None допустим: так CSV отдаёт недостающие столбцы, а JSON — null.
+    """
+    if None in row:
+        raise ValueError(f'Строка {number}: значений больше, чем столбцов')
+    unknown = sorted(set(row) - set(FIELDS))
+    if unknown:
+        raise ValueError(
+            f'Строка {number}: неизвестные поля {", ".join(unknown)}'
+        )
+    for name, value in row.items():
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f'Строка {number}: {name} должно быть строкой')
+    return row
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def wanted_slug(row, max_length):
+    """Slug из файла, если он корректен, иначе — из заголовка."""
+    slug = (row.get('slug') or '')[:max_length]
+    try:
+        validate_slug(slug)
+    except ValidationError:
+        return base_slug(row.get('title') or '', max_length)
+    return slug
+
+
+def build_batch(rows, author):
+    """Проверенные заметки пачки со свободными slug.
+
+    rows — пары номера строки и словаря. Занятые slug всех заметок
+    пачки находим одним запросом по префиксам, дальше суффиксы
+    подбираются в памяти. Заметка, которая не проходит проверки
+    полей модели, останавливает импорт с номером своей строки.
+    """
+    max_length = Note._meta.get_field('slug').max_length
+    default_title = Note._meta.get_field('title').default
+    bases = [wanted_slug(row, max_length) for _, row in rows]
+    taken = set(Note.objects.filter(reduce(or_, (
+        prefix_q(taken_prefix(base, max_length))
+        for base in set(bases)
+    ))).values_list('slug', flat=True))
+    notes = []
+    for (number, row), base in zip(rows, bases):
+        slug = free_slug(base, taken, max_length)
+        taken.add(slug)
+        note = Note(
+            title=row.get('title') or default_title,
+            text=row.get('text') or '',
+            slug=slug,
+            author=author,
+        )
+        try:
+            note.full_clean(exclude=('author',), validate_unique=False)
+        except ValidationError as error:
+            raise ValueError(f'Строка {number}: ' + '; '.join(
+                f'{name}: {message}'
+                for name, messages in error.message_dict.items()
+                for message in messages
+            ))
+        notes.append(note)
+    return notes
+
+
+def import_notes(rows, author, batch_size=BATCH_SIZE):
+    """Сохраняет заметки пачками через bulk_create, возвращает их число.
+
+    Весь импорт — одна транзакция: ошибка в любой строке откатывает
+    и уже записанные пачки, файл можно исправить и отправить заново.
+    Если параллельная запись заняла slug между проверкой и вставкой,
+    пачка откатывается до своей точки сохранения и собирается заново.
+    """
+    created = 0
+    with transaction.atomic():
+        for batch in batched(rows, batch_size):
+            for attempt in range(IMPORT_ATTEMPTS):
+                try:
+                    with transaction.atomic():
+                        Note.objects.bulk_create(
+                            build_batch(batch, author)
+                        )
+                    break
+                except IntegrityError:
+                    if attempt == IMPORT_ATTEMPTS - 1:
+                        raise
+            created += len(batch)
+    return created
+
+
+class Echo:
+    """Файл, который отдаёт записанную строку вместо хранения."""
+
+    def write(self, value):
+        return value
+
+
+def export_lines(queryset, file_format, chunk_size=2000):
+    """Строки выгрузки; заметки читаются курсором, а не целиком."""
+    rows = queryset.order_by('pk').values_list(*FIELDS).iterator(
+        chunk_size=chunk_size
+    )
+    if file_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(FIELDS)
+        for row in rows:
+            yield writer.writerow(row)
+        return
+    for row in rows:
+        yield json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + '\n'
@@ -0,0 +1,88 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from notes.models import Note
+from notes.pagination import KeysetPaginator
+from notes.slugs import prefix_q
+from notes.views import NotesList
+
+# Обход всей таблицы без индекса: «SCAN notes_note» (в SQLite до 3.36 —
+# «SCAN TABLE notes_note»).
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+( AS \w+)?$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+def hot_queries():
+    """Запросы горячих страниц по именам.
+
+    Значения параметров произвольные: план от них не зависит.
+    """
+    own_notes = Note.objects.filter(author_id=1)
+    notes = KeysetPaginator(
+        own_notes, NotesList.keyset_ordering, settings.NOTES_COUNT_ON_PAGE
+    )
+    return {
+        'заметки: первая страница': notes.keys_query(),
+        'заметки: следующая страница': notes.keys_query(
+            notes.encode_cursor((1,))
+        ),
+        'заметки: предыдущая страница': notes.keys_query(
+            notes.encode_cursor((1,), forward=False)
+        ),
+        'заметки: строки страницы': notes.rows_query((1,), (1,)),
+        'заметка': own_notes.filter(slug='zametka'),
+        'занятые slug': Note.objects.filter(
+            prefix_q('zametka')
+        ).values_list('slug'),
+    }
+
+
+def query_plan(queryset, using):
+    """Строки EXPLAIN QUERY PLAN и те из них, что выдают медленный план.
+
+    Медленный план — обход таблицы без индекса или сортировка во
+    временном B-дереве. Обход по индексу допустим, только если запрос
+    без условий и с LIMIT: тогда читаются лишь первые строки индекса.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        plan = [row[-1] for row in cursor.fetchall()]
+    limited_walk = (
+        not queryset.query.where and queryset.query.high_mark is not None
+    )
+    slow = [
+        detail for detail in plan
+        if FULL_SCAN.match(detail) or TEMP_SORT in detail
+        or (detail.startswith('SCAN ') and not limited_walk)
+    ]
+    return plan, slow
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет планы запросов горячих страниц и падает, если запрос '
+        'обходит таблицу целиком или сортирует во временном B-дереве.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if connections[using].vendor != 'sqlite':
+            raise CommandError('Проверка планов написана для SQLite.')
+        failed = []
+        for name, queryset in hot_queries().items():
+            plan, slow = query_plan(queryset, using)
+            status = 'МЕДЛЕННО' if slow else 'ок'
+            self.stdout.write(f'{status:<9} {name}: {"; ".join(plan)}')
+            if slow:
+                failed.append(name)
+        if failed:
+            raise CommandError(
+                f'Медленные планы у запросов: {", ".join(failed)}.'
+            )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from notes.bulk import FORMATS, export_lines
+from notes.models import Note
+
+
+class Command(BaseCommand):
+    help = 'Выгружает заметки в JSON Lines или CSV, не загружая их в память.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--author',
+                            help='Имя пользователя; по умолчанию — все.')
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument('--output', default='-',
+                            help='Путь к файлу или - для stdout.')
+
+    def handle(self, *args, **options):
+        notes = Note.objects.all()
+        if options['author']:
+            notes = notes.filter(author__username=options['author'])
+        lines = export_lines(notes, options['format'])
+        if options['output'] == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            output.writelines(lines)
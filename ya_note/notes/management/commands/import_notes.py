@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.bulk import BATCH_SIZE, FORMATS, import_notes, parse_rows
+
+
+class Command(BaseCommand):
+    help = 'Импортирует заметки пользователя из файла JSON Lines или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу или - для stdin.')
+        parser.add_argument('--author', required=True,
+                            help='Имя пользователя — автора заметок.')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='По умолчанию — по расширению файла.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if Path(path).suffix == '.csv' else 'jsonl'
+        )
+        try:
+            author = get_user_model().objects.get(
+                username=options['author']
+            )
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'Нет пользователя {options["author"]}.')
+        source = (
+            sys.stdin if path == '-'
+            else open(path, encoding='utf-8', newline='')
+        )
+        try:
+            created = import_notes(
+                parse_rows(source, file_format), author,
+                batch_size=options['batch_size']
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        self.stdout.write(f'Импортировано заметок: {created}')
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:16
+
+from django.db import migrations
+
+# Внешняя таблица FTS5 над notes_note: текст хранится только в самой
+# таблице заметок, а триггеры обновляют индекс при любой записи,
+# включая bulk_create и QuerySet.update().
+CREATE = (
+    "CREATE VIRTUAL TABLE notes_note_fts USING fts5(title, text, "
+    "content='notes_note', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER notes_note_fts_ai AFTER INSERT ON notes_note BEGIN "
+    "INSERT INTO notes_note_fts(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); END",
+    "CREATE TRIGGER notes_note_fts_ad AFTER DELETE ON notes_note BEGIN "
+    "INSERT INTO notes_note_fts(notes_note_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); END",
+    "CREATE TRIGGER notes_note_fts_au AFTER UPDATE OF title, text "
+    "ON notes_note BEGIN "
+    "INSERT INTO notes_note_fts(notes_note_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); "
+    "INSERT INTO notes_note_fts(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); END",
+    "INSERT INTO notes_note_fts(notes_note_fts) VALUES ('rebuild')",
+)
+DROP = (
+    'DROP TRIGGER IF EXISTS notes_note_fts_ai',
+    'DROP TRIGGER IF EXISTS notes_note_fts_ad',
+    'DROP TRIGGER IF EXISTS notes_note_fts_au',
+    'DROP TABLE IF EXISTS notes_note_fts',
+)
+
+
+def run(statements):
+    """На базах, кроме SQLite, поиск работает без миграции."""
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE), run(DROP)),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:37
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+# На SQLite AddField пересоздаёт таблицу notes_note, а вместе с ней
+# пропадают триггеры полнотекстового индекса. Индекс снимается до
+# изменения таблицы и строится заново после.
+search = import_module('notes.migrations.0002_note_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0002_note_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(search.run(search.DROP), search.run(search.CREATE)),
+        migrations.AddField(
+            model_name='note',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменена'),
+        ),
+        migrations.RunPython(search.run(search.CREATE), search.run(search.DROP)),
+    ]
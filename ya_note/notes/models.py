@@ -1,7 +1,9 @@
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
 
-from pytils.translit import slugify
+from .slugs import base_slug, free_slug, prefix_q, taken_prefix
+
+SLUG_SAVE_ATTEMPTS = 5
 
 
 class Note(models.Model):
@@ -27,12 +29,40 @@ class Note(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField('Изменена', auto_now=True)
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('author', 'id'), name='note_author_id_idx'),
+        )
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        """Сохраняет заметку, подбирая свободный slug, если он не задан.
+
+        Сначала пробуем slug из заголовка без лишних запросов. Если он
+        занят, одним запросом по префиксу находим занятые варианты
+        и берём первый свободный суффикс. Параллельная запись того же
+        slug приводит к IntegrityError — тогда подбираем заново.
+        Остальные IntegrityError поднимаются сразу.
+        """
+        if self.slug:
+            return super().save(*args, **kwargs)
+        max_length = self._meta.get_field('slug').max_length
+        base = base_slug(self.title, max_length)
+        self.slug = base
+        for attempt in range(SLUG_SAVE_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if (attempt == SLUG_SAVE_ATTEMPTS - 1
+                        or not Note.objects.filter(slug=self.slug).exists()):
+                    self.slug = ''
+                    raise
+            taken = set(Note.objects.filter(
+                prefix_q(taken_prefix(base, max_length))
+            ).values_list('slug', flat=True))
+            self.slug = free_slug(base, taken, max_length)
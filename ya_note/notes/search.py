@@ -0,0 +1,279 @@
+import bisect
+import re
+import threading
+from collections import Counter, defaultdict
+from functools import reduce
+from operator import and_, or_
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+
+from .models import Note
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return [token.casefold() for token in TOKEN_RE.findall(text or '')]
+
+
+class FtsBackend:
+    """Поиск по виртуальной таблице SQLite FTS5.
+
+    Таблица и триггеры, которые держат её в актуальном состоянии,
+    создаются миграцией; ранжирование — встроенный bm25.
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    @staticmethod
+    def match(terms):
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def _execute(self, sql, queryset, terms, params=()):
+        """Выполняет запрос к FTS, ограничив его строками queryset."""
+        scope, scope_params = '', ()
+        if queryset.query.where:
+            scope_sql, scope_params = queryset.order_by().values(
+                'pk'
+            ).query.sql_with_params()
+            scope = f'AND rowid IN ({scope_sql})'
+        sql = sql.format(table=self.table, scope=scope)
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(
+                sql, (self.match(terms), *scope_params, *params)
+            )
+            return cursor.fetchall()
+
+    def count(self, queryset, terms):
+        return self._execute(
+            'SELECT COUNT(*) FROM {table} WHERE {table} MATCH %s {scope}',
+            queryset, terms
+        )[0][0]
+
+    def ranked_ids(self, queryset, terms, offset, limit):
+        return [row[0] for row in self._execute(
+            'SELECT rowid FROM {table} WHERE {table} MATCH %s {scope} '
+            'ORDER BY rank LIMIT %s OFFSET %s',
+            queryset, terms, (limit, offset)
+        )]
+
+
+class ScanBackend:
+    """Поиск подстрокой через ORM для баз без FTS5.
+
+    Своего состояния нет: все процессы видят одно и то же, в том числе
+    изменения через bulk_create и update(). Цена — чтение всей таблицы
+    и отсутствие ранжирования: свежие записи первыми. В SQLite без FTS5
+    регистр не учитывается только у латиницы.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def filter(self, queryset, terms):
+        return queryset.filter(reduce(and_, (
+            reduce(or_, (
+                Q(**{f'{field}__icontains': term}) for field in self.fields
+            )) for term in terms
+        )))
+
+    def count(self, queryset, terms):
+        return self.filter(queryset, terms).count()
+
+    def ranked_ids(self, queryset, terms, offset, limit):
+        return list(self.filter(queryset, terms).order_by(
+            '-pk'
+        ).values_list('pk', flat=True)[offset:offset + limit])
+
+
+class InvertedIndex:
+    """Обратный индекс в памяти процесса для баз без FTS5.
+
+    Строится при первом поиске одним проходом по таблице и дальше
+    обновляется сигналами своего процесса. Записи других процессов,
+    bulk_create и update() он не видит, поэтому годится только для
+    одного процесса: runserver и тесты (SEARCH_MEMORY_INDEX).
+    Вес документа — число вхождений терминов.
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = fields
+        self._lock = threading.Lock()
+        self._postings = None
+        self._documents = {}
+        self._vocabulary = None
+
+    def _document_tokens(self, values):
+        return Counter(
+            token for value in values for token in tokenize(value)
+        )
+
+    def _ensure_built(self):
+        if self._postings is not None:
+            return
+        with self._lock:
+            if self._postings is not None:
+                return
+            self._postings = defaultdict(dict)
+            rows = self.model._default_manager.values_list(
+                'pk', *self.fields
+            ).iterator()
+            for pk, *values in rows:
+                self._add(pk, values)
+
+    def _add(self, pk, values):
+        tokens = self._document_tokens(values)
+        self._documents[pk] = tokens
+        for token, frequency in tokens.items():
+            self._postings[token][pk] = frequency
+        self._vocabulary = None
+
+    def _remove(self, pk):
+        for token in self._documents.pop(pk, ()):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(pk, None)
+                if not postings:
+                    del self._postings[token]
+        self._vocabulary = None
+
+    def clear(self):
+        """Сбрасывает индекс; он перестроится при следующем поиске."""
+        with self._lock:
+            self._postings = None
+            self._documents = {}
+            self._vocabulary = None
+
+    def update(self, instance):
+        if self._postings is None:
+            return
+        with self._lock:
+            self._remove(instance.pk)
+            self._add(
+                instance.pk,
+                [getattr(instance, field) for field in self.fields]
+            )
+
+    def remove(self, instance):
+        if self._postings is None:
+            return
+        with self._lock:
+            self._remove(instance.pk)
+
+    def _expand(self, term):
+        """Все слова словаря, начинающиеся с term (поиск по префиксу)."""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        start = bisect.bisect_left(self._vocabulary, term)
+        for token in self._vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            yield token
+
+    def scores(self, terms):
+        self._ensure_built()
+        with self._lock:
+            result = None
+            for term in terms:
+                matches = Counter()
+                for token in self._expand(term):
+                    matches.update(self._postings[token])
+                result = matches if result is None else Counter({
+                    pk: score + matches[pk]
+                    for pk, score in result.items() if pk in matches
+                })
+            return result or Counter()
+
+    def _ranked_in_scope(self, queryset, terms):
+        scores = self.scores(terms)
+        allowed = set(queryset.filter(
+            pk__in=list(scores)
+        ).values_list('pk', flat=True))
+        return [
+            pk for pk, _ in sorted(
+                scores.items(), key=lambda item: (-item[1], item[0])
+            ) if pk in allowed
+        ]
+
+    def count(self, queryset, terms):
+        return len(self._ranked_in_scope(queryset, terms))
+
+    def ranked_ids(self, queryset, terms, offset, limit):
+        return self._ranked_in_scope(queryset, terms)[offset:offset + limit]
+
+
+class SearchIndex:
+    """Полнотекстовый поиск по модели с выбором движка по базе.
+
+    Без FTS5 поиск идёт по индексу в памяти, если включён
+    SEARCH_MEMORY_INDEX, иначе — подстрокой по таблице.
+    """
+
+    def __init__(self, model, fields, fts_table):
+        self.model = model
+        self.fts = FtsBackend(fts_table)
+        self.fallback = InvertedIndex(model, fields)
+        self.scan = ScanBackend(fields)
+        self._fts_available = {}
+
+    def backend(self, queryset):
+        alias = queryset.db
+        connection = connections[alias]
+        if connection.vendor == 'sqlite':
+            name = connection.settings_dict['NAME']
+            if name not in self._fts_available:
+                self._fts_available[name] = (
+                    self.fts.table in connection.introspection.table_names()
+                )
+            if self._fts_available[name]:
+                return self.fts
+        return self.fallback if settings.SEARCH_MEMORY_INDEX else self.scan
+
+    def search(self, query, queryset=None):
+        if queryset is None:
+            queryset = self.model._default_manager.all()
+        return SearchResults(self, queryset, tokenize(query))
+
+
+class SearchResults:
+    """Ленивая выдача поиска: Paginator вызывает count() и срезы."""
+
+    def __init__(self, index, queryset, terms):
+        self.model = index.model
+        self.index = index
+        self.queryset = queryset
+        self.terms = terms
+        self._count = None
+
+    def _backend(self):
+        return self.index.backend(self.queryset)
+
+    def count(self):
+        if self._count is None:
+            self._count = self._backend().count(
+                self.queryset, self.terms
+            ) if self.terms else 0
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start = item.start or 0
+        stop = self.count() if item.stop is None else item.stop
+        if not self.terms or stop <= start:
+            return []
+        ids = self._backend().ranked_ids(
+            self.queryset, self.terms, start, stop - start
+        )
+        objects = self.queryset.in_bulk(ids)
+        return [objects[pk] for pk in ids if pk in objects]
+
+
+notes_index = SearchIndex(Note, ('title', 'text'), 'notes_note_fts')
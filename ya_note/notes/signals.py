@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .middleware import user_cache
+from .models import Note
+from .search import notes_index
+
+
+@receiver(post_save, sender=Note)
+def index_note(instance, **kwargs):
+    notes_index.fallback.update(instance)
+
+
+@receiver(post_delete, sender=Note)
+def unindex_note(instance, **kwargs):
+    notes_index.fallback.remove(instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_user(instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(connection_created)
+def configure_sqlite(connection, **kwargs):
+    """Применяет SQLITE_PRAGMAS к каждому новому соединению с SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,68 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import Q
+from pytils.translit import slugify
+
+# Запас под суффикс вида «-123» при поиске занятых вариантов.
+SUFFIX_RESERVE = 11
+DEFAULT_SLUG = 'note'
+
+
+@lru_cache(maxsize=settings.NOTES_SLUG_CACHE_SIZE)
+def transliterate(title):
+    """pytils.translit.slugify с LRU-кэшем на процесс.
+
+    Массовый импорт часто приносит одинаковые заголовки, а
+    транслитерация — самая дорогая часть подбора slug.
+    """
+    return slugify(title)
+
+
+def cache_stats():
+    """Счётчики кэша транслитерации для мониторинга."""
+    info = transliterate.cache_info()
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'size': info.currsize,
+        'maxsize': info.maxsize,
+    }
+
+
+def base_slug(title, max_length):
+    """Slug из заголовка, обрезанный до длины поля."""
+    return transliterate(title)[:max_length] or DEFAULT_SLUG
+
+
+def candidates(base, max_length):
+    """base, base-2, base-3, ... — все не длиннее max_length."""
+    yield base
+    number = 2
+    while True:
+        suffix = f'-{number}'
+        yield base[:max_length - len(suffix)] + suffix
+        number += 1
+
+
+def free_slug(base, taken, max_length):
+    """Первый вариант base, которого нет среди taken."""
+    for candidate in candidates(base, max_length):
+        if candidate not in taken:
+            return candidate
+
+
+def taken_prefix(base, max_length):
+    """Общее начало всех вариантов base: по нему ищем занятые."""
+    return base[:max_length - SUFFIX_RESERVE] if (
+        len(base) > max_length - SUFFIX_RESERVE
+    ) else base
+
+
+def prefix_q(prefix):
+    """Slug, начинающиеся с prefix, — диапазоном по индексу slug.
+
+    slug__startswith в SQLite — LIKE без учёта регистра, а с ним
+    индекс не используется и читается целиком.
+    """
+    return Q(slug__gte=prefix, slug__lt=prefix + '\uffff')
@@ -0,0 +1,58 @@
+"""Помощники для тестов: бюджет SQL-запросов на view и вход клиентов."""
+from importlib import import_module
+
+from django.conf import settings
+from django.test import Client
+
+from .middleware import view_query_budget
+
+
+class QueryBudgetMixin:
+    """Проверка бюджета запросов для тестов на TestCase."""
+
+    def assertQueryBudget(self, response, budget=None):  # noqa: N802
+        """Падает, если view превысил бюджет запросов или повторяет запросы.
+
+        Бюджет по умолчанию берётся из атрибута query_budget view.
+        Статистику собирает QueryCountMiddleware.
+        """
+        stats = response.query_stats
+        if budget is None:
+            budget = view_query_budget(
+                getattr(response, 'wsgi_request', None)
+                or response.asgi_request
+            )
+        self.assertIsNotNone(budget, 'У view не объявлен query_budget.')
+        details = '\n'.join(
+            f'{count} x {sql}'
+            for sql, count in stats.fingerprints.most_common()
+        )
+        self.assertLessEqual(
+            stats.count, budget,
+            f'{stats.count} SQL-запросов при бюджете {budget}:\n{details}'
+        )
+        self.assertFalse(
+            stats.duplicates, f'Повторяющиеся запросы (N+1):\n{details}'
+        )
+
+
+_session_keys = {}
+
+
+def logged_in_client(user):
+    """Client, вошедший как user; сессия переиспользуется между тестами.
+
+    force_login на каждый тест создаёт новую сессию и обновляет
+    last_login. Здесь ключ сессии запоминается по пользователю и
+    подставляется в cookie, пока сессия жива в хранилище.
+    """
+    client = Client()
+    key = (user.pk, user.get_username(), user.get_session_auth_hash())
+    session_key = _session_keys.get(key)
+    store = import_module(settings.SESSION_ENGINE).SessionStore()
+    if session_key is not None and store.exists(session_key):
+        client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+    else:
+        client.force_login(user)
+        _session_keys[key] = client.cookies[settings.SESSION_COOKIE_NAME].value
+    return client
@@ -1,8 +1,23 @@
+from http import HTTPStatus
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import (
+    AsyncClient, Client, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
 from notes.forms import NoteForm
-from .urls_basetest import ADD_URL, EDIT_URL, LIST_URL, BaseTest
+from notes.middleware import user_cache
+from notes.models import Note
+from notes.search import notes_index
+from notes.testing import QueryBudgetMixin
+from .urls_basetest import ADD_URL, DETAIL_URL, EDIT_URL, LIST_URL, BaseTest
 
 
-class TestNotes(BaseTest):
+class TestNotes(QueryBudgetMixin, BaseTest):
     """Тестирование передачи данных на страницы."""
 
     def test_note_is_in_list_context(self):
@@ -34,3 +49,159 @@ class TestNotes(BaseTest):
             self.note,
             self.client_reader.get(LIST_URL).context['object_list']
         )
+
+    def test_notes_cursor_pagination(self):
+        """Список заметок листается по курсору без повторов и пропусков."""
+        Note.objects.bulk_create(
+            Note(title=f'Заметка {index}', text='Текст',
+                 slug=f'note-{index}', author=self.author_user)
+            for index in range(settings.NOTES_COUNT_ON_PAGE)
+        )
+        first_page = self.client_author.get(LIST_URL).context
+        self.assertEqual(len(first_page['object_list']),
+                         settings.NOTES_COUNT_ON_PAGE)
+        second_page = self.client_author.get(
+            LIST_URL, {'cursor': first_page['page_obj'].next_cursor}
+        ).context
+        notes = (list(first_page['object_list'])
+                 + list(second_page['object_list']))
+        self.assertEqual(notes, list(
+            Note.objects.filter(author=self.author_user).order_by('pk')
+        ))
+        self.assertFalse(second_page['page_obj'].has_next())
+
+    def test_search_only_own_notes(self):
+        """Поиск находит заметки по префиксу и только свои."""
+        for backend in ('fts', 'fallback'):
+            with self.subTest(backend=backend):
+                notes_index.fallback.clear()
+                patch = mock.patch.object(
+                    notes_index, 'backend', lambda queryset: (
+                        notes_index.fallback if backend == 'fallback'
+                        else notes_index.fts
+                    )
+                )
+                with patch:
+                    found = self.client_author.get(
+                        reverse('notes:search'), {'q': 'текс'}
+                    ).context['object_list']
+                self.assertEqual(list(found), [self.note])
+        notes_index.fallback.clear()
+
+    def test_search_scan_sees_bulk_updates(self):
+        """Поиск по таблице видит изменения через update() без сигналов."""
+        Note.objects.filter(pk=self.note.pk).update(text='новый текст')
+        with mock.patch.object(
+            notes_index, 'backend', lambda queryset: notes_index.scan
+        ):
+            found = self.client_author.get(
+                reverse('notes:search'), {'q': 'нов'}
+            ).context['object_list']
+        self.assertEqual(list(found), [self.note])
+
+    def test_hot_views_query_budget(self):
+        """Горячие страницы укладываются в бюджет запросов и без N+1."""
+        urls = (LIST_URL, DETAIL_URL, reverse('notes:search') + '?q=текст')
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertQueryBudget(self.client_author.get(url))
+
+    def test_not_modified(self):
+        """Без изменений заметок страницы отвечают 304 по ETag.
+
+        Страница заметки отвечает 304 и по If-Modified-Since.
+        """
+        for url in (LIST_URL, DETAIL_URL):
+            with self.subTest(url=url):
+                etag = self.client_author.get(url)['ETag']
+                response = self.client_author.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+                self.assertFalse(response.content)
+        last_modified = self.client_author.get(DETAIL_URL)['Last-Modified']
+        response = self.client_author.get(
+            DETAIL_URL, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        etags = [self.client_author.get(url)['ETag']
+                 for url in (LIST_URL, DETAIL_URL)]
+        self.note.text = 'Новый текст'
+        self.note.save()
+        for url, etag in zip((LIST_URL, DETAIL_URL), etags):
+            with self.subTest(url=url):
+                response = self.client_author.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+        USER_CACHE_SIZE=10,
+    )
+    def test_cached_sessions_and_users(self):
+        """С cached_db и кэшем пользователей вход не стоит запросов к базе.
+
+        Изменение пользователя сбрасывает его запись в кэше.
+        """
+        def auth_queries(response):
+            return [sql for sql in response.query_stats.fingerprints
+                    if 'FROM "django_session"' in sql
+                    or sql.startswith('SELECT "auth_user".')]
+
+        user_cache.clear()
+        client = Client()
+        client.force_login(self.author_user)
+        self.assertTrue(auth_queries(client.get(LIST_URL)))
+        response = client.get(LIST_URL)
+        self.assertFalse(auth_queries(response))
+        self.assertEqual(response.context['user'], self.author_user)
+        self.author_user.first_name = 'Новое имя'
+        self.author_user.save()
+        response = client.get(LIST_URL)
+        self.assertEqual(response.context['user'].first_name, 'Новое имя')
+        user_cache.clear()
+
+
+@override_settings(ROOT_URLCONF='yanote.urls_async')
+class TestAsyncViews(QueryBudgetMixin, TransactionTestCase):
+    """Async-варианты списка и заметки отдают то же, что синхронные.
+
+    Async-view ходят в базу из своих потоков, поэтому данные
+    должны быть зафиксированы — отсюда TransactionTestCase.
+    """
+
+    def test_async_read_views(self):
+        author = get_user_model().objects.create(username='Автор')
+        note = Note.objects.create(title='Асинхронная', text='Текст',
+                                   author=author, slug='async-note')
+        client = AsyncClient()
+        client.force_login(author)
+
+        async def get(url):
+            return await client.get(url)
+
+        for url in (LIST_URL, reverse('notes:detail', args=(note.slug,))):
+            with self.subTest(url=url):
+                response = async_to_sync(get)(url)
+                self.assertContains(response, note.title)
+                self.assertTrue(response.query_stats.count)
+                self.assertQueryBudget(response)
+
+    @override_settings(QUERY_STATS_ENABLED=False)
+    def test_query_stats_disabled(self):
+        """Без QUERY_STATS_ENABLED запросы не считаются ни в одной цепочке."""
+        author = get_user_model().objects.create(username='Автор')
+        client, async_client = Client(), AsyncClient()
+        client.force_login(author)
+        async_client.force_login(author)
+
+        async def get(url):
+            return await async_client.get(url)
+
+        responses = (client.get(LIST_URL), async_to_sync(get)(LIST_URL))
+        for response in responses:
+            with self.subTest(response=response):
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertFalse(hasattr(response, 'query_stats'))
+                self.assertNotIn('X-DB-Query-Count', response)
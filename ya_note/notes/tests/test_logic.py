@@ -1,7 +1,25 @@
+import io
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError
+from django.test import override_settings
 from pytils.translit import slugify
 
+from notes.bulk import import_notes
+from notes.management.commands import check_query_plans
 from notes.models import Note
-from .urls_basetest import ADD_URL, DELETE_URL, EDIT_URL, BaseTest
+from notes.routers import PRIMARY_PIN_COOKIE, ReplicaRouter, replica_reads
+from notes.slugs import cache_stats, transliterate
+from .urls_basetest import (
+    ADD_URL, DELETE_URL, EDIT_URL, EXPORT_URL, IMPORT_URL, LIST_URL, SLUG,
+    BaseTest,
+)
 
 
 class TestNoteCRUD(BaseTest):
@@ -45,6 +63,38 @@ class TestNoteCRUD(BaseTest):
         self.assertEqual(new_note.slug, slugify(self.new_data['title']))
         self.assertEqual(new_note.author, self.author_user)
 
+    def test_same_title_gets_unique_slugs(self):
+        """Одинаковые заголовки получают slug с числовым суффиксом."""
+        del self.new_data['slug']
+        notes = set(Note.objects.all())
+        self.client_author.post(ADD_URL, data=self.new_data)
+        self.client_reader.post(ADD_URL, data=self.new_data)
+        self.client_author.post(ADD_URL, data=self.new_data)
+        slug = slugify(self.new_data['title'])
+        self.assertEqual(
+            sorted(note.slug for note in set(Note.objects.all()) - notes),
+            [slug, f'{slug}-2', f'{slug}-3']
+        )
+
+    def test_unrelated_integrity_error_is_not_retried(self):
+        """Ошибка не из-за slug поднимается сразу, без подбора slug."""
+        note = Note(title='Без текста', text=None, author=self.author_user)
+        with mock.patch(
+            'django.db.models.Model.save', side_effect=IntegrityError
+        ) as save, self.assertRaises(IntegrityError):
+            note.save()
+        save.assert_called_once()
+        self.assertEqual(note.slug, '')
+
+    def test_slug_transliteration_is_cached(self):
+        """Повторный заголовок не транслитерируется заново."""
+        transliterate.cache_clear()
+        del self.new_data['slug']
+        self.client_author.post(ADD_URL, data=self.new_data)
+        self.client_author.post(ADD_URL, data=self.new_data)
+        stats = cache_stats()
+        self.assertEqual((stats['misses'], stats['hits']), (1, 1))
+
     def test_author_can_edit_note(self):
         """Пользователь может редактировать свою заметку."""
         self.client_author.post(EDIT_URL, data=self.new_data)
@@ -81,3 +131,142 @@ class TestNoteCRUD(BaseTest):
         self.assertEqual(note.text, updated_note.text)
         self.assertEqual(note.slug, updated_note.slug)
         self.assertEqual(note.author, updated_note.author)
+
+
+class TestNotesBulk(BaseTest):
+    """Тестирование массового импорта и выгрузки заметок."""
+
+    def test_import_resolves_slug_collisions(self):
+        """Импорт не падает на занятых и повторяющихся slug."""
+        rows = [
+            {'title': 'Импорт', 'text': 'Первая', 'slug': SLUG},
+            {'title': 'Импорт', 'text': 'Вторая'},
+            {'title': 'Импорт', 'text': 'Третья'},
+        ]
+        response = self.client_reader.post(
+            IMPORT_URL,
+            '\n'.join(json.dumps(row) for row in rows),
+            content_type='application/x-ndjson',
+        )
+        self.assertEqual(response.json(), {'created': len(rows)})
+        imported = Note.objects.filter(
+            author=self.reader_user, title='Импорт'
+        ).order_by('pk')
+        self.assertEqual(
+            [(note.text, note.slug) for note in imported],
+            [('Первая', f'{SLUG}-2'), ('Вторая', 'import'),
+             ('Третья', 'import-2')]
+        )
+
+    def test_import_rejects_invalid_rows(self):
+        """Неверная строка — ответ 400 с её номером, заметки не пишутся."""
+        notes = set(Note.objects.all())
+        good = json.dumps({'title': 'Импорт', 'text': 'Текст'})
+        for row in (
+            {'title': 'x', 'slug': 7},
+            {'title': ['a']},
+            {'title': 'x' * 300, 'text': 'Текст'},
+            {'title': 'x', 'text': 'Текст', 'color': 'red'},
+        ):
+            with self.subTest(row=row):
+                response = self.client_reader.post(
+                    IMPORT_URL, f'{good}\n{json.dumps(row)}',
+                    content_type='application/x-ndjson',
+                )
+                self.assertContains(response, 'Строка 2', status_code=400)
+        response = self.client_reader.post(
+            f'{IMPORT_URL}?format=csv',
+            'title,text,slug\nИмпорт,Текст,\nx,Текст,,лишнее\n',
+            content_type='text/csv',
+        )
+        self.assertContains(response, 'Строка 3', status_code=400)
+        self.assertEqual(notes, set(Note.objects.all()))
+
+    def test_import_rolls_back_committed_batches(self):
+        """Ошибка в поздней пачке откатывает и ранние пачки."""
+        rows = [(1, {'title': 'Импорт', 'text': 'Первая'}),
+                (2, {'title': 'Импорт', 'text': 'Вторая'}),
+                (3, {'title': 'x' * 300, 'text': 'Третья'})]
+        with self.assertRaisesMessage(ValueError, 'Строка 3'):
+            import_notes(rows, self.reader_user, batch_size=1)
+        self.assertFalse(Note.objects.filter(title='Импорт').exists())
+
+    def test_export_streams_only_own_notes(self):
+        """Выгрузка содержит только заметки пользователя."""
+        response = self.client_author.get(EXPORT_URL)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)['slug'] for line in lines], [self.note.slug]
+        )
+
+    def test_csv_commands_round_trip(self):
+        """Заметки, выгруженные командой в CSV, загружаются обратно."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'notes.csv'
+            call_command('export_notes', author=self.author_user.username,
+                         format='csv', output=str(path))
+            call_command('import_notes', str(path),
+                         author=self.reader_user.username,
+                         stdout=io.StringIO())
+        copy = Note.objects.get(author=self.reader_user, text=self.note.text,
+                                title=self.note.title)
+        self.assertEqual(copy.slug, f'{self.note.slug}-2')
+
+    def test_check_query_plans_command(self):
+        """Горячие запросы идут по индексам.
+
+        Запрос без подходящего индекса роняет проверку.
+        """
+        output = io.StringIO()
+        call_command('check_query_plans', stdout=output)
+        self.assertNotIn('МЕДЛЕННО', output.getvalue())
+        slow = {'по тексту': Note.objects.filter(text='Текст')}
+        with mock.patch.object(
+            check_query_plans, 'hot_queries', return_value=slow
+        ), self.assertRaisesMessage(CommandError, 'по тексту'):
+            call_command('check_query_plans', stdout=io.StringIO())
+
+
+class TestReplicaReads(BaseTest):
+    """Чтение с реплик только там, где отставание не опасно."""
+
+    def setUp(self):
+        self.checked = []
+        patcher = mock.patch.object(
+            ReplicaRouter, 'is_healthy',
+            lambda router, alias: self.checked.append(alias) or True,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(DATABASE_REPLICAS=['default'])
+    def test_only_marked_get_views_read_from_replica(self):
+        """Список читается с реплики, форма и её проверки — нет."""
+        self.client_author.get(LIST_URL)
+        self.assertTrue(self.checked)
+        self.checked.clear()
+        self.client_author.get(ADD_URL)
+        self.client_author.post(ADD_URL, {'title': 'Новая', 'text': 'Текст'})
+        self.assertFalse(self.checked)
+
+    @override_settings(DATABASE_REPLICAS=['default'])
+    def test_reads_pinned_to_primary_after_write(self):
+        """После записи автор читает из основной базы."""
+        response = self.client_author.post(
+            ADD_URL, {'title': 'Новая', 'text': 'Текст'}
+        )
+        self.assertIn(PRIMARY_PIN_COOKIE, response.cookies)
+        self.client_author.get(LIST_URL)
+        self.assertFalse(self.checked)
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_users_and_sessions_read_from_primary(self):
+        """Пользователи и сессии не читаются с реплики."""
+        router = ReplicaRouter()
+        token = replica_reads.set(True)
+        try:
+            self.assertEqual(router.db_for_read(Note), 'replica')
+            for model in (get_user_model(), Session):
+                self.assertEqual(router.db_for_read(model), 'default')
+        finally:
+            replica_reads.reset(token)
@@ -1,8 +1,9 @@
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.test import TestCase
 from django.urls import reverse
 
 from notes.models import Note
+from notes.testing import logged_in_client
 
 SLUG = 'zametka'
 LIST_URL = reverse('notes:list')
@@ -15,6 +16,8 @@ LOGIN_URL = reverse('users:login')
 LOGOUT_URL = reverse('users:logout')
 SUCCESS_URL = reverse('notes:success')
 DETAIL_URL = reverse('notes:detail', args=(SLUG,))
+IMPORT_URL = reverse('notes:import')
+EXPORT_URL = reverse('notes:export')
 EDIT_REDIRECT_URL = f'{LOGIN_URL}?next={EDIT_URL}'
 DELETE_REDIRECT_URL = f'{LOGIN_URL}?next={DELETE_URL}'
 LIST_REDIRECT_URL = f'{LOGIN_URL}?next={LIST_URL}'
@@ -31,13 +34,11 @@ class BaseTest(TestCase):
     @classmethod
     def setUpTestData(cls):
         cls.author_user = User.objects.create(username='Писатель')
-        cls.client_author = Client()
-        cls.client_author.force_login(cls.author_user)
+        cls.client_author = logged_in_client(cls.author_user)
         cls.note = Note.objects.create(title='Заголовок заметки', text='Текст',
                                        author=cls.author_user, slug=SLUG)
         cls.reader_user = User.objects.create(username='Читатель')
-        cls.client_reader = Client()
-        cls.client_reader.force_login(cls.reader_user)
+        cls.client_reader = logged_in_client(cls.reader_user)
         cls.readers_note = Note.objects.create(title='Заметка Читателя',
                                                text='Текст',
                                                author=cls.reader_user)
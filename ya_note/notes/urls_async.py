@@ -0,0 +1,21 @@
+"""Те же адреса, что в notes.urls, но страницы чтения — async-view.
+
+Подключается в yanote.urls_async вместо notes.urls при ASYNC_VIEWS = True.
+"""
+from django.urls import path
+
+from notes import urls as sync_urls, views
+from notes.async_views import pooled
+
+app_name = sync_urls.app_name
+
+ASYNC_VIEWS = {
+    'list': pooled(views.NotesList),
+    'detail': pooled(views.NoteDetail),
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name], name=pattern.name)
+    if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in sync_urls.urlpatterns
+]
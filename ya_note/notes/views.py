@@ -1,9 +1,18 @@
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import (
+    HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+)
 from django.urls import reverse_lazy
+from django.utils.functional import cached_property
 from django.views import generic
 
+from .bulk import FORMATS, export_lines, import_notes, parse_rows
+from .conditional import ConditionalGetMixin
 from .forms import NoteForm
 from .models import Note
+from .pagination import KeysetPaginationMixin, KeysetPaginator
+from .search import notes_index
 
 
 class Home(generic.TemplateView):
@@ -49,11 +58,103 @@ class NoteDelete(NoteBase, generic.DeleteView):
     template_name = 'notes/delete.html'
 
 
-class NotesList(NoteBase, generic.ListView):
-    """Список всех заметок пользователя."""
+class NotesList(
+        KeysetPaginationMixin, NoteBase, ConditionalGetMixin, generic.ListView
+):
+    """Список всех заметок пользователя, постранично по курсору."""
     template_name = 'notes/list.html'
+    paginate_by = settings.NOTES_COUNT_ON_PAGE
+    keyset_ordering = ('pk',)
+    query_budget = 5
+    read_replica = True
 
+    def get_etag_data(self):
+        """Ключи и время правки заметок страницы."""
+        return KeysetPaginator(
+            self.get_queryset(), self.keyset_ordering, self.paginate_by
+        ).page_values(self.request.GET.get(self.cursor_kwarg), 'updated_at')
 
-class NoteDetail(NoteBase, generic.DetailView):
+
+class NoteSearch(NoteBase, generic.ListView):
+    """Поиск по заметкам пользователя, по релевантности."""
+    template_name = 'notes/search.html'
+    paginate_by = settings.NOTES_COUNT_ON_PAGE
+    query_budget = 6
+    read_replica = True
+
+    def get_queryset(self):
+        return notes_index.search(
+            self.request.GET.get('q', ''), super().get_queryset()
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
+
+
+class NoteDetail(NoteBase, ConditionalGetMixin, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+    query_budget = 4
+    read_replica = True
+
+    @cached_property
+    def updated_at(self):
+        """Время правки заметки; задаёт и ETag, и Last-Modified."""
+        return self.get_queryset().filter(
+            slug=self.kwargs['slug']
+        ).values_list('updated_at', flat=True).first()
+
+    def get_last_modified(self):
+        return self.updated_at
+
+    def get_etag_data(self):
+        return self.updated_at
+
+
+class BulkFormatMixin:
+    """Формат файла берётся из параметра ?format= (jsonl или csv)."""
+
+    def get_format(self):
+        file_format = self.request.GET.get('format', 'jsonl')
+        return file_format if file_format in FORMATS else None
+
+
+class NotesExport(BulkFormatMixin, NoteBase, generic.View):
+    """Потоковая выгрузка всех заметок пользователя."""
+    read_replica = True
+
+    def get(self, request, *args, **kwargs):
+        file_format = self.get_format()
+        if file_format is None:
+            return HttpResponseBadRequest('Неизвестный формат.')
+        response = StreamingHttpResponse(
+            export_lines(self.get_queryset(), file_format),
+            content_type=f'{FORMATS[file_format]}; charset=utf-8',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="notes.{file_format}"'
+        )
+        return response
+
+
+class NotesImport(BulkFormatMixin, NoteBase, generic.View):
+    """Потоковый импорт заметок из тела запроса.
+
+    Тело читается построчно и сохраняется пачками, поэтому
+    большой файл не загружается в память целиком.
+    """
+
+    def post(self, request, *args, **kwargs):
+        file_format = self.get_format()
+        if file_format is None:
+            return HttpResponseBadRequest('Неизвестный формат.')
+        lines = (line.decode('utf-8') for line in request)
+        try:
+            created = import_notes(
+                parse_rows(lines, file_format), request.user
+            )
+        except (UnicodeDecodeError, ValueError) as error:
+            return HttpResponseBadRequest(str(error))
+        return JsonResponse({'created': created})
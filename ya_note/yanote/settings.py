@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -22,11 +23,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'notes.middleware.QueryCountMiddleware',
+    'notes.middleware.ReplicaReadsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'notes.middleware.CachedUserMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -87,3 +91,49 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+NOTES_COUNT_ON_PAGE = 20
+
+# Размер LRU-кэша транслитерации заголовков в slug (на процесс).
+NOTES_SLUG_CACHE_SIZE = 10_000
+
+# Учёт SQL-запросов каждого запроса к сайту. Если выключен,
+# QueryCountMiddleware снимается с цепочки при старте, а async-view
+# не ставят счётчик.
+QUERY_STATS_ENABLED = True
+# Заголовки X-DB-* со статистикой SQL-запросов в ответах.
+QUERY_STATS_HEADERS = True
+
+# Хранение сессий: db (по умолчанию) или cached_db — чтение из кэша
+# без запроса к базе.
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get(
+    'SESSION_BACKEND', 'db'
+)
+
+# Кэш пользователей в памяти процесса: число записей (0 — выключен)
+# и срок жизни записи в секундах.
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 0))
+USER_CACHE_TIMEOUT = int(os.environ.get('USER_CACHE_TIMEOUT', 60))
+
+# PRAGMA, которые выполняются при каждом подключении к SQLite.
+SQLITE_PRAGMAS = {}
+
+# Поиск без FTS5: индекс в памяти процесса или подстрокой по таблице.
+# Индекс в памяти обновляют только сигналы своего процесса, поэтому
+# он годится лишь для одного процесса — runserver и тестов.
+SEARCH_MEMORY_INDEX = True
+
+# Реплики для чтения: алиасы из DATABASES. Читают с них только
+# GET-запросы к view с read_replica = True (см. notes.routers).
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['notes.routers.ReplicaRouter']
+REPLICA_HEALTH_CHECK_SECONDS = 5
+# Сколько секунд после записи автор читает из основной базы.
+REPLICA_PIN_SECONDS = 10
+
+# Async-view для чтения под ASGI (notes.urls_async) и размер пула
+# потоков, в котором они работают с базой.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '').lower() in ('1', 'true', 'yes')
+ASYNC_DB_THREADS = int(os.environ.get('ASYNC_DB_THREADS', 8))
+if ASYNC_VIEWS:
+    ROOT_URLCONF = 'yanote.urls_async'
@@ -0,0 +1,45 @@
+"""Настройки для прогона тестов: быстрее, но с тем же поведением."""
+from .settings import *  # noqa: F401, F403
+from .settings import MIDDLEWARE
+
+DEBUG = False
+
+# Тестовые пароли не нуждаются в стойком и медленном PBKDF2.
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+# Сессии в отдельном кэше: вход не пишет в базу, и сессии
+# переживают откат транзакции теста.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+    },
+}
+SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Заголовки безопасности тестами не проверяются.
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE if middleware not in (
+        'django.middleware.security.SecurityMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    )
+]
+
+# Бюджеты запросов проверяют сами тесты, предупреждения
+# notes.queries в выводе прогона не нужны.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'loggers': {'notes.queries': {'level': 'ERROR'}},
+}
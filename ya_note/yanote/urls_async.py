@@ -0,0 +1,10 @@
+"""Корневой URLconf с async-view для чтения; выбирается при ASYNC_VIEWS."""
+from django.urls import include, path
+
+from yanote import urls
+
+urlpatterns = [
+    path('', include('notes.urls_async')),
+    *(pattern for pattern in urls.urlpatterns
+      if getattr(pattern, 'app_name', None) != 'notes'),
+]